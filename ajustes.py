@@ -0,0 +1,36 @@
+"""Configuración de la aplicación leída del entorno (y de `.env`).
+
+Streamlit vuelve a ejecutar app.py en cada interacción, pero un módulo
+importado sólo se evalúa una vez por proceso: aquí se carga `.env` y se
+interpretan las variables una única vez.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Modo paginado de "Realizar Examen"
+PREGUNTAS_POR_PAGINA = int(os.getenv("EXAMEN_PREGUNTAS_POR_PAGINA", 10))
+PAGINACION_PREGUNTAS_SERVIDOR = os.getenv("EXAMEN_PAGINACION_SERVIDOR", "false").lower() in ("1", "true", "yes")
+
+# Buscador del banco de preguntas en "Crear Examen"
+BANCO_PREGUNTAS_TAMANO_PAGINA = int(os.getenv("BANCO_PREGUNTAS_TAMANO_PAGINA", 500))
+BANCO_PREGUNTAS_RESULTADOS = int(os.getenv("BANCO_PREGUNTAS_RESULTADOS", 20))
+
+# Página "Resultados": tamaño de página al descargar y filas que se muestran en la tabla
+RESULTADOS_TAMANO_PAGINA = int(os.getenv("RESULTADOS_TAMANO_PAGINA", 1000))
+RESULTADOS_FILAS_TABLA = int(os.getenv("RESULTADOS_FILAS_TABLA", 1000))
+EXPORTACION_TAMANO_PAGINA = int(os.getenv("EXPORTACION_TAMANO_PAGINA", 1000))
+
+# Tablas paginadas de "Exámenes" y "Usuarios": columnas que se piden al backend (`fields`;
+# vacío = todas) y tamaños de página disponibles
+CAMPOS_EXAMENES = [c.strip() for c in os.getenv("EXAMENES_CAMPOS", "id,titulo,descripcion,fechaInicio,fechaFin").split(",") if c.strip()]
+CAMPOS_USUARIOS = [c.strip() for c in os.getenv("USUARIOS_CAMPOS", "").split(",") if c.strip()]
+TAMANOS_PAGINA_TABLA = [int(t) for t in os.getenv("TABLAS_TAMANOS_PAGINA", "25,50,100,250").split(",")]
+
+# Catálogo de exámenes de "Realizar Examen" y "Resultados": tamaño de página al descargarlo
+CATALOGO_TAMANO_PAGINA = int(os.getenv("CATALOGO_TAMANO_PAGINA", 500))
+
+# Puerto en el que se expone /metrics en formato Prometheus (0 = desactivado)
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", 0))
@@ -0,0 +1,437 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+import json_codec
+from api_routes import get_backend_pool
+from metricas import REGISTRO, SECCION, etiqueta_endpoint
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+# Métodos que se pueden reintentar sin efectos secundarios
+METODOS_IDEMPOTENTES = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class ApiError(Exception):
+    """Error al llamar a la API, con el contexto necesario para mostrarlo en la UI."""
+
+    def __init__(self, mensaje, url=None, content_type=None, cuerpo=None, status_code=None):
+        super().__init__(mensaje)
+        self.url = url
+        self.content_type = content_type
+        self.cuerpo = cuerpo
+        self.status_code = status_code
+
+    @property
+    def backend_caido(self) -> bool:
+        # Fallos de red, plazos vencidos, circuito abierto o 5xx: se puede servir la caché
+        return self.status_code is None or self.status_code >= 500
+
+
+@dataclass
+class ApiRequest:
+    method: str
+    endpoint: str
+    params: Optional[dict] = None
+    data: Optional[dict] = None
+
+
+@dataclass
+class BatchResult:
+    request: ApiRequest
+    data: Any = None
+    error: Optional[ApiError] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class Validador:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    valor: Any
+
+
+class ValidatorStore:
+    """Validadores HTTP (ETag/Last-Modified) y último cuerpo decodificado por ruta y parámetros."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave) -> Optional[Validador]:
+        with self._lock:
+            validador = self._entries.get(clave)
+            if validador is not None:
+                self._entries.move_to_end(clave)
+            return validador
+
+    def set(self, clave, validador: Validador):
+        with self._lock:
+            self._entries[clave] = validador
+            self._entries.move_to_end(clave)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# ---------------- Configuración del cliente -------------------
+@dataclass
+class ClientConfig:
+    pool_connections: int = 10  # Número de hosts distintos con pool propio
+    pool_maxsize: int = 20  # Conexiones keep-alive por host
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    status_forcelist: tuple[int, ...] = (502, 503, 504)
+    max_parallel: int = 8  # Peticiones simultáneas en un lote
+    max_validators: int = 256  # URLs con ETag/Last-Modified recordados
+    connect_timeout: float = 3.05
+    read_timeout: float = 20.0
+    # recurso -> (connect, read), p. ej. API_TIMEOUT_RESULTS=3,30
+    timeouts_por_recurso: dict = field(default_factory=dict)
+    breaker_enabled: bool = True
+    breaker_failures: int = 5  # Fallos consecutivos que abren el circuito
+    breaker_reset: float = 30.0  # Segundos abierto antes de la petición de prueba
+    hedge_delay: float = 0.0  # Segundos antes de lanzar un GET duplicado (0 = desactivado)
+
+    @staticmethod
+    def _timeouts_por_recurso_from_env() -> dict:
+        timeouts = {}
+        for nombre, valor in os.environ.items():
+            if nombre.startswith("API_TIMEOUT_") and valor:
+                connect, _, read = valor.partition(",")
+                timeouts[nombre[len("API_TIMEOUT_"):].lower()] = (float(connect), float(read or connect))
+        return timeouts
+
+    @classmethod
+    def from_env(cls) -> "ClientConfig":
+        return cls(
+            pool_connections=int(os.getenv("API_POOL_CONNECTIONS", cls.pool_connections)),
+            pool_maxsize=int(os.getenv("API_POOL_MAXSIZE", cls.pool_maxsize)),
+            max_retries=int(os.getenv("API_MAX_RETRIES", cls.max_retries)),
+            backoff_factor=float(os.getenv("API_BACKOFF_FACTOR", cls.backoff_factor)),
+            max_parallel=int(os.getenv("API_MAX_PARALLEL", cls.max_parallel)),
+            max_validators=int(os.getenv("API_MAX_VALIDATORS", cls.max_validators)),
+            connect_timeout=float(os.getenv("API_CONNECT_TIMEOUT", cls.connect_timeout)),
+            read_timeout=float(os.getenv("API_READ_TIMEOUT", cls.read_timeout)),
+            timeouts_por_recurso=cls._timeouts_por_recurso_from_env(),
+            breaker_enabled=os.getenv("API_BREAKER_ENABLED", "true").lower() in ("1", "true", "yes"),
+            breaker_failures=int(os.getenv("API_BREAKER_FAILURES", cls.breaker_failures)),
+            breaker_reset=float(os.getenv("API_BREAKER_RESET", cls.breaker_reset)),
+            hedge_delay=float(os.getenv("API_HEDGE_DELAY", cls.hedge_delay)),
+        )
+
+
+def _cerrar_respuesta(future):
+    # Libera la conexión del intento duplicado que perdió la carrera
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+# ---------------- Cliente HTTP compartido -------------------
+class ApiClient:
+    """Cliente HTTP con pool de conexiones keep-alive, compartido entre hilos.
+
+    Una sola instancia por proceso: todas las sesiones de Streamlit reutilizan
+    las conexiones TCP/TLS abiertas hacia el backend.
+    """
+
+    def __init__(self, config: Optional[ClientConfig] = None):
+        self.config = config or ClientConfig.from_env()
+        self._lock = threading.Lock()
+        self._session = None
+        self._executor = None
+        self._hedge_executor = None
+        self.validadores = ValidatorStore(self.config.max_validators)
+        self._breakers = {}  # URL base de la réplica -> CircuitBreaker
+
+    def _build_session(self) -> requests.Session:
+        # Sin reintentos en urllib3: los hace _send, que puede cambiar de réplica en cada intento
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            max_retries=0,
+            pool_block=False,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Connection": "keep-alive",
+            # gzip/deflate siempre; br (y zstd) sólo si urllib3 tiene el decodificador instalado
+            "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
+        })
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        # Inicialización perezosa protegida para accesos concurrentes
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.config.max_parallel, thread_name_prefix="api-batch"
+                    )
+        return self._executor
+
+    @property
+    def hedge_executor(self) -> ThreadPoolExecutor:
+        # Pool propio: un GET de un lote no debe esperar por hilos del mismo lote
+        if self._hedge_executor is None:
+            with self._lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=self.config.max_parallel * 2, thread_name_prefix="api-hedge"
+                    )
+        return self._hedge_executor
+
+    def breaker_de(self, base) -> CircuitBreaker:
+        # Un circuito por réplica: una réplica caída no corta el tráfico hacia las demás
+        with self._lock:
+            breaker = self._breakers.get(base)
+            if breaker is None:
+                breaker = self._breakers[base] = CircuitBreaker(
+                    failure_threshold=self.config.breaker_failures,
+                    reset_timeout=self.config.breaker_reset,
+                    enabled=self.config.breaker_enabled,
+                )
+            return breaker
+
+    def circuitos(self) -> dict:
+        with self._lock:
+            return dict(self._breakers)
+
+    def run_batch(self, peticiones, fetch) -> list[BatchResult]:
+        # Ejecuta `fetch(peticion)` en paralelo; los resultados conservan el orden de entrada
+        futures = [self.executor.submit(fetch, peticion) for peticion in peticiones]
+        resultados = []
+        for peticion, future in zip(peticiones, futures):
+            try:
+                resultados.append(BatchResult(peticion, data=future.result()))
+            except ApiError as e:
+                resultados.append(BatchResult(peticion, error=e))
+            except Exception as e:
+                resultados.append(BatchResult(peticion, error=ApiError(f"Error inesperado: {str(e)}")))
+        return resultados
+
+    def timeout_para(self, url) -> tuple[float, float]:
+        # Plazo (connect, read) del primer segmento de la ruta con configuración propia
+        for segmento in urlparse(url).path.strip("/").split("/"):
+            timeout = self.config.timeouts_por_recurso.get(segmento.lower())
+            if timeout is not None:
+                return timeout
+        return (self.config.connect_timeout, self.config.read_timeout)
+
+    def request(self, method, url, headers=None, json=None, params=None, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout_para(url))
+        kwargs.update(headers=headers, json=json, params=params)
+        if method.upper() == "GET" and self.config.hedge_delay > 0:
+            return self._request_hedged(method, url, **kwargs)
+        return self._send(method, url, **kwargs)
+
+    def _elegir_replica(self, pool, evitar) -> Optional[str]:
+        # Réplica con el circuito cerrado; mejor una que no esté en `evitar`, si queda alguna
+        abiertas = set()
+        for excluir in (evitar, ()):
+            while (base := pool.elegir(excluir=abiertas.union(excluir))) is not None:
+                if self.breaker_de(base).permitir():
+                    return base
+                abiertas.add(base)
+        return None
+
+    def _send(self, method, url, usadas=None, **kwargs) -> requests.Response:
+        """Envía la petición eligiendo la réplica en cada intento.
+
+        Los métodos idempotentes se reintentan (fallos de red o `status_forcelist`)
+        en otra réplica si la hay; con una sola se reintenta en ella con espera
+        exponencial. Un POST sólo se repite si no llegó a conectar. `usadas` se
+        comparte entre los intentos duplicados de `_request_hedged` para que
+        cada uno vaya a una réplica distinta.
+        """
+        pool = get_backend_pool()
+        ruta = pool.ruta_de(url)
+        idempotente = method.upper() in METODOS_IDEMPOTENTES
+        usadas = set() if usadas is None else usadas
+        probadas = set()
+        error = None
+        for intento in range(self.config.max_retries + 1):
+            if ruta is None:
+                # URL fuera del pool de réplicas: un circuito por host
+                partes = urlparse(url)
+                base = f"{partes.scheme}://{partes.netloc}"
+                if not self.breaker_de(base).permitir():
+                    base = None
+            else:
+                with self._lock:
+                    evitar = probadas | usadas
+                base = self._elegir_replica(pool, evitar)
+            if base is None:
+                if error is not None:
+                    raise error
+                raise CircuitOpenError(
+                    f"Circuito abierto en todas las réplicas tras {self.config.breaker_failures} fallos; "
+                    f"se reintentará en {self.config.breaker_reset:.0f}s"
+                )
+            if base in probadas:
+                time.sleep(self.config.backoff_factor * 2 ** (intento - 1))
+            probadas.add(base)
+            with self._lock:
+                usadas.add(base)
+            destino = url if ruta is None else f"{base}/{ruta}"
+            breaker = self.breaker_de(base)
+            # El pool de réplicas lleva la cuenta de peticiones en curso y fallos por host
+            pool.inicio(destino)
+            ok = False
+            try:
+                response = self.session.request(method, destino, **kwargs)
+                ok = response.status_code < 500
+            except requests.exceptions.RequestException as e:
+                breaker.registrar_fallo()
+                if not (idempotente or isinstance(e, requests.exceptions.ConnectTimeout)):
+                    raise
+                error = e
+                continue
+            finally:
+                pool.fin(destino, ok)
+            if ok:
+                breaker.registrar_exito()
+            else:
+                breaker.registrar_fallo()
+            if idempotente and response.status_code in self.config.status_forcelist \
+                    and intento < self.config.max_retries:
+                response.close()
+                continue
+            return response
+        raise error
+
+    def _request_hedged(self, method, url, **kwargs) -> requests.Response:
+        # Si el primer intento tarda más de hedge_delay se lanza otro (a otra réplica, si la hay)
+        # y gana el primero que responda
+        usadas = set()
+        primero = self.hedge_executor.submit(self._send, method, url, usadas, **kwargs)
+        try:
+            return primero.result(timeout=self.config.hedge_delay)
+        except FuturesTimeoutError:
+            pass
+        segundo = self.hedge_executor.submit(self._send, method, url, usadas, **kwargs)
+        pendientes = {primero, segundo}
+        error = None
+        while pendientes:
+            terminados, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for future in terminados:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                for perdedor in pendientes:
+                    perdedor.add_done_callback(_cerrar_respuesta)
+                return response
+        raise error
+
+    def fetch_json(self, method, url, headers=None, data=None, params=None, condicional=True):
+        # Versión sin dependencias de Streamlit: se puede usar desde hilos en segundo plano.
+        # Con condicional=False no se guarda el cuerpo para peticiones condicionales
+        # (lecturas de una sola vez, como las exportaciones).
+        headers = dict(headers or {})
+        clave = guardado = None
+        if method.upper() == "GET" and condicional:
+            # Petición condicional: si el recurso no cambió, el backend responde 304 sin cuerpo
+            # Por ruta y no por URL: cualquier réplica puede responder 304 al mismo validador
+            ruta = get_backend_pool().ruta_de(url) or url
+            clave = (ruta, tuple(sorted((params or {}).items())), headers.get("X-Role"))
+            guardado = self.validadores.get(clave)
+            if guardado is not None:
+                if guardado.etag:
+                    headers["If-None-Match"] = guardado.etag
+                if guardado.last_modified:
+                    headers["If-Modified-Since"] = guardado.last_modified
+
+        etiquetas = {"endpoint": etiqueta_endpoint(url), "metodo": method.upper(), "seccion": SECCION.get()}
+        inicio = time.perf_counter()
+        try:
+            response = self.request(method, url, headers=headers, json=data, params=params)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            respuesta = getattr(e, "response", None)
+            status = respuesta.status_code if respuesta is not None else None
+            REGISTRO.incrementar("evaluapp_peticion_errores_total", estado=str(status or "conexion"), **etiquetas)
+            # El cuerpo del error se conserva: p. ej. un 409 puede traer el recurso que ya existía
+            raise ApiError(f"Error en la conexión con la API: {str(e)}", url=url, status_code=status,
+                           cuerpo=respuesta.text[:500] if respuesta is not None and respuesta.text else None) from e
+        finally:
+            REGISTRO.observar("evaluapp_peticion_segundos", time.perf_counter() - inicio, **etiquetas)
+
+        if response.status_code == 304 and guardado is not None:
+            return guardado.valor
+
+        # Verificar el tipo de contenido antes de intentar decodificar JSON
+        content_type = response.headers.get('content-type', '')
+        if 'application/json' not in content_type.lower():
+            raise ApiError(
+                f"La API no devolvió JSON válido. Tipo de contenido: {content_type}",
+                url=url, content_type=content_type, cuerpo=response.text[:500],
+                status_code=response.status_code,
+            )
+
+        contenido = response.content
+        REGISTRO.observar("evaluapp_peticion_bytes", len(contenido), **etiquetas)
+        if not contenido:  # Si la respuesta está vacía
+            return []
+        try:
+            with REGISTRO.medir("evaluapp_json_decode_segundos", endpoint=etiquetas["endpoint"]):
+                valor = json_codec.loads(contenido)
+        except ValueError as e:
+            raise ApiError(
+                f"Error al procesar la respuesta de la API: {str(e)}",
+                url=url, content_type=content_type,
+                cuerpo=contenido[:500].decode("utf-8", errors="replace"),
+                status_code=response.status_code,
+            ) from e
+
+        if clave is not None:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self.validadores.set(clave, Validador(etag, last_modified, valor))
+        return valor
+
+    def get(self, url, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
@@ -1,3 +1,8 @@
+import os
+import threading
+
+from load_balancer import BackendPool
+
 # Rutas de la API
 API_BASE_URL = "https://evaluapp.onrender.com/api"
 
@@ -20,16 +25,35 @@ ROLES = {
     "student": "STUDENT"
 }
 
-# Construir URL completa
+# Réplicas del backend: API_BASE_URLS (separadas por comas), si no API_URL y si no API_BASE_URL.
+# Se lee de forma perezosa para que load_dotenv() se haya ejecutado antes.
+_backend_pool = None
+_pool_lock = threading.Lock()
+
+def get_backend_pool():
+    global _backend_pool
+    if _backend_pool is None:
+        with _pool_lock:
+            if _backend_pool is None:
+                urls = os.getenv("API_BASE_URLS") or os.getenv("API_URL") or API_BASE_URL
+                _backend_pool = BackendPool(
+                    [url.strip() for url in urls.split(",") if url.strip()],
+                    strategy=os.getenv("API_LB_STRATEGY", "round_robin"),
+                    eject_failures=int(os.getenv("API_LB_EJECT_FAILURES", 3)),
+                    eject_seconds=float(os.getenv("API_LB_EJECT_SECONDS", 30)),
+                )
+    return _backend_pool
+
+# Construir URL completa (sobre la primera réplica; el cliente HTTP elige la réplica en cada intento)
 def build_url(endpoint):
-    return f"{API_BASE_URL}/{endpoint}"
+    return get_backend_pool().url_de(endpoint)
 
 # Funciones auxiliares para construir URLs específicas
 def build_exam_url(exam_id):
-    return f"{API_BASE_URL}/{ENDPOINTS['examenes']}/{exam_id}"
+    return build_url(f"{ENDPOINTS['examenes']}/{exam_id}")
 
 def build_question_url(question_id):
-    return f"{API_BASE_URL}/{ENDPOINTS['preguntas']}/{question_id}"
+    return build_url(f"{ENDPOINTS['preguntas']}/{question_id}")
 
 def build_option_url(option_id):
-    return f"{API_BASE_URL}/{ENDPOINTS['opciones']}/{option_id}"
+    return build_url(f"{ENDPOINTS['options']}/{option_id}")
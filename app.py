@@ -1,36 +1,36 @@
 import streamlit as st
-import requests
-import pandas as pd
-from datetime import datetime, date
+import functools
+import hashlib
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, date, timedelta
 import os
-from dotenv import load_dotenv
-from api_routes import ENDPOINTS, build_url
-from dataclasses import dataclass
-import json
-
-# ---------------- DTO -------------------
-@dataclass
-class ExamenRequestDTO:
-    titulo: str
-    descripcion: str
-    fechaInicio: date
-    fechaFin: date
-    creadorId: int
-    preguntasIds: list[int] # Nuevo campo para los IDs de las preguntas
-
-    def to_dict(self) -> dict:
-        return {
-            "titulo": self.titulo,
-            "descripcion": self.descripcion,
-            "fechaInicio": self.fechaInicio.isoformat(),
-            "fechaFin": self.fechaFin.isoformat(),
-            "creadorId": self.creadorId,
-            "preguntasIds": self.preguntasIds # Incluir los IDs de las preguntas
-        }
+from ajustes import (
+    PREGUNTAS_POR_PAGINA, PAGINACION_PREGUNTAS_SERVIDOR, BANCO_PREGUNTAS_TAMANO_PAGINA,
+    BANCO_PREGUNTAS_RESULTADOS, RESULTADOS_TAMANO_PAGINA, RESULTADOS_FILAS_TABLA, EXPORTACION_TAMANO_PAGINA,
+    CAMPOS_EXAMENES, CAMPOS_USUARIOS, TAMANOS_PAGINA_TABLA, CATALOGO_TAMANO_PAGINA, METRICAS_PUERTO,
+)
+import json_codec
+from api_routes import ENDPOINTS, build_url, get_backend_pool
+from api_client import ApiClient, ApiError, ApiRequest
+from cache import ResponseCache, make_key
+from cache_backends import recurso_de
+from respuestas import IndiceOpciones, construir_payload
+from paginacion import Pagina, desde_respuesta, ordenar_local, params_pagina, proyectar
+from envios import ColaEnvios, ENVIADO, FALLIDO, nueva_clave_idempotencia
+from borradores import AlmacenBorradores
+from indice_preguntas import IndicePreguntas
+from catalogo import CatalogoExamenes
+from instantaneas import AlmacenInstantaneas, HAY_PYARROW, obtenedor_http
+from examenes import ExamenRequestDTO, payload_asociacion
+from exportacion import MIME, ErrorExportacion, exportar, formatos_disponibles, iterar_paginas
+from metricas import REGISTRO, SECCION, en_seccion, servir_metricas
+from importacion import Importador, formato_de, huella_fichero, informe_csv, COMPLETADO, INVALIDO, ERROR
 
 # --------------- Configuración -------------------
 st.set_page_config(page_title="EvaluApp", page_icon="📊", layout="wide")
-load_dotenv()
 
 ROLES = {
     "admin": "ADMIN",
@@ -55,90 +55,425 @@ def select_role():
         role = st.session_state.role
     return role
 
+@st.cache_resource
+def get_client():
+    # Cliente único por proceso, reutilizado entre reruns y sesiones
+    return ApiClient()
+
+@st.cache_resource
+def get_cola_envios():
+    # Cola de envíos de exámenes compartida por el proceso; al arrancar retoma
+    # los envíos pendientes que quedaran de una ejecución anterior
+    client = get_client()
+    cache = get_cache()
+
+    def enviar(endpoint, payload, headers):
+        return client.post(build_url(endpoint), headers=headers, json=payload)
+
+    cola = ColaEnvios(
+        os.getenv("ENVIOS_DB_PATH", os.path.join(".cache", "envios.sqlite3")),
+        enviar,
+        max_concurrencia=int(os.getenv("ENVIOS_CONCURRENCIA", 4)),
+        max_intentos=int(os.getenv("ENVIOS_MAX_INTENTOS", 10)),
+        retencion=float(os.getenv("ENVIOS_RETENCION", 7 * 24 * 3600)),
+        al_entregar=lambda clave: cache.invalidate(ENDPOINTS['results']),
+    )
+    cola.iniciar()
+    return cola
+
+@st.cache_resource
+def get_borradores():
+    return AlmacenBorradores(
+        os.getenv("BORRADORES_DB_PATH", os.path.join(".cache", "borradores.sqlite3")),
+        debounce=float(os.getenv("BORRADORES_DEBOUNCE", 2.0)),
+    )
+
+@st.cache_resource
+def get_importador():
+    # Las escrituras pasan por _fetch para invalidar las lecturas cacheadas de exámenes
+    cache = get_cache()
+    client = get_client()
+
+    def buscar(datos, headers):
+        # Examen que creó un intento anterior cuya respuesta se perdió (409 sin ID): el más
+        # reciente con el mismo título, fechas y creador. Sin caché: acaba de crearse
+        url = build_url(ENDPOINTS["examenes"])
+
+        def obtener(params):
+            return client.fetch_json("GET", url, headers=headers, params=params, condicional=False)
+
+        def coincide(examen):
+            return (examen.get("titulo") == datos["titulo"]
+                    and str(examen.get("fechaInicio"))[:10] == datos["fechaInicio"]
+                    and str(examen.get("fechaFin"))[:10] == datos["fechaFin"]
+                    and examen.get("creadorId", datos["creadorId"]) == datos["creadorId"])
+
+        ids = [examen["id"] for pagina in iterar_paginas(obtener, CATALOGO_TAMANO_PAGINA)
+               for examen in pagina if coincide(examen)]
+        return max(ids, default=None)
+
+    return Importador(
+        os.getenv("IMPORTACION_DB_PATH", os.path.join(".cache", "importaciones.sqlite3")),
+        lambda endpoint, data, headers: _fetch(cache, "POST", endpoint, headers=headers, data=data),
+        endpoint_examenes=ENDPOINTS["examenes"],
+        concurrencia=int(os.getenv("IMPORTACION_CONCURRENCIA", 4)),
+        tamano_lote=int(os.getenv("IMPORTACION_TAMANO_LOTE", 50)),
+        buscar=buscar,
+    )
+
+@st.cache_resource
+def get_derivados():
+    # Estructuras construidas a partir de listados (índices, tablas), compartidas
+    # por todas las sesiones: (nombre, rol) -> (páginas de origen, huella, valor),
+    # y el cerrojo que protege el diccionario entre sesiones e hilos
+    return {}, threading.Lock()
+
+@st.cache_resource
+def get_instantaneas():
+    # Copias locales de exámenes y preguntas para servir sin esperar al backend y
+    # mientras no responda; None si están desactivadas o falta pyarrow
+    if not HAY_PYARROW or os.getenv("INSTANTANEAS_ACTIVAS", "true").lower() not in ("1", "true", "yes"):
+        return None
+    return AlmacenInstantaneas(
+        os.getenv("INSTANTANEAS_DIR", os.path.join(".cache", "instantaneas")),
+        refresco=float(os.getenv("INSTANTANEAS_REFRESCO", 60)),
+    )
+
+@st.cache_resource
+def get_servidor_metricas():
+    # Un único servidor /metrics por proceso, compartido por todas las sesiones
+    if METRICAS_PUERTO <= 0:
+        return None
+    try:
+        return servir_metricas(METRICAS_PUERTO)
+    except OSError:
+        return None  # Puerto ocupado (p. ej. otra instancia en la misma máquina)
+
+def get_estudiante_id():
+    # ⚠️ Temporal — hasta tener login se usa un identificador anónimo guardado en la
+    # URL (?estudiante=...), que sobrevive a reconexiones y reinicios del servidor
+    if "estudiante_id" not in st.session_state:
+        estudiante_id = st.query_params.get("estudiante")
+        if not estudiante_id:
+            estudiante_id = uuid.uuid4().hex
+            st.query_params["estudiante"] = estudiante_id
+        st.session_state.estudiante_id = estudiante_id
+    return st.session_state.estudiante_id
+
 def get_headers():
     if 'role' in st.session_state:
         return {"X-Role": ROLES[st.session_state.role]}
     return {}
 
+@st.cache_resource
+def get_cache():
+    # Caché de lecturas compartida por todas las sesiones del proceso;
+    # las claves incluyen el rol de la cabecera X-Role
+    return ResponseCache.from_env()
+
+def mostrar_error_api(error):
+    st.error(f"❌ {str(error)}")
+    if error.cuerpo is not None:
+        st.error(f"Datos recibidos (primeros 500 caracteres): {error.cuerpo}...")
+    if error.content_type:
+        st.error(f"Tipo de contenido: {error.content_type}")
+    st.error(f"URL de la API: {error.url}")
+
+def _fetch(cache, method, endpoint, headers=None, data=None, params=None):
+    # Núcleo de make_request sin llamadas a Streamlit (se ejecuta también en hilos del lote)
+    url = build_url(endpoint)
+    client = get_client()
+    if method.upper() == "GET":
+        key = make_key(endpoint, params, (headers or {}).get("X-Role"))
+        return cache.get_or_fetch(
+            key, lambda: client.fetch_json(method, url, headers=headers, data=data, params=params)
+        )
+
+    result = client.fetch_json(method, url, headers=headers, data=data, params=params)
+    invalidar_lecturas(cache, endpoint)
+    return result
+
+def invalidar_lecturas(cache, endpoint):
+    # Tras una escritura: lecturas cacheadas y copia local del recurso modificado
+    cache.invalidate(endpoint)
+    almacen = get_instantaneas()
+    if almacen is not None:
+        almacen.invalidar(recurso_de(endpoint))
+
 def make_request(method, endpoint, headers=None, data=None, params=None):
     try:
-        url = build_url(endpoint)
-        response = requests.request(method, url, headers=headers, json=data, params=params)
-        response.raise_for_status()
-        
-        # Verificar el tipo de contenido antes de intentar decodificar JSON
-        content_type = response.headers.get('content-type', '')
-        if 'application/json' in content_type.lower():
-            try:
-                # Intentar decodificar con un límite de recursión
-                text = response.text
-                if not text:  # Si la respuesta está vacía
-                    return []
-                
-                # Intentar decodificar con un límite de recursión
-                max_depth = 100  # Límite personalizado
-                def decode_json(text, depth=0):
-                    if depth > max_depth:
-                        raise ValueError(f"Límite de recursión alcanzado (máximo {max_depth})")
-                    try:
-                        return json.loads(text)
-                    except json.JSONDecodeError:
-                        # Si falla, intentar limpiar el texto
-                        cleaned_text = text.strip()
-                        if cleaned_text.startswith('[') and cleaned_text.endswith(']'):
-                            return json.loads(cleaned_text)
-                        elif cleaned_text.startswith('{') and cleaned_text.endswith('}'):
-                            return json.loads(cleaned_text)
-                        else:
-                            raise
-                
-                return decode_json(text)
-            except (ValueError, json.JSONDecodeError) as e:
-                st.error(f"❌ Error al procesar la respuesta de la API: {str(e)}")
-                st.error(f"Datos recibidos (primeros 500 caracteres): {response.text[:500]}...")
-                st.error(f"Tipo de contenido: {content_type}")
-                st.error(f"URL de la API: {url}")
-                return None
-        else:
-            st.error(f"❌ La API no devolvió JSON válido. Tipo de contenido: {content_type}")
-            st.error(f"Datos recibidos (primeros 500 caracteres): {response.text[:500]}...")
-            st.error(f"URL de la API: {url}")
-            return None
-    except requests.exceptions.RequestException as e:
-        st.error(f"❌ Error en la conexión con la API: {str(e)}")
-        st.error(f"URL de la API: {url}")
+        return _fetch(get_cache(), method, endpoint, headers=headers, data=data, params=params)
+    except ApiError as e:
+        mostrar_error_api(e)
         return None
 
+def fetch_many(peticiones, headers=None, mostrar_errores=True):
+    # Lanza en paralelo peticiones independientes; la página espera solo a la más lenta
+    cache = get_cache()
+    seccion_actual = SECCION.get()
+
+    def ejecutar(p):
+        # Los hilos del lote no heredan el contexto: se propaga la sección para las métricas
+        with en_seccion(seccion_actual):
+            return _fetch(cache, p.method, p.endpoint, headers=headers, data=p.data, params=p.params)
+
+    resultados = get_client().run_batch(peticiones, ejecutar)
+    if mostrar_errores:
+        for resultado in resultados:
+            if not resultado.ok:
+                mostrar_error_api(resultado.error)
+    return resultados
+
+def cargar_paginas(endpoint, headers, tamano, mostrar_errores=True):
+    # Descarga un listado completo por páginas: la primera indica cuántas quedan y
+    # el resto se pide en paralelo. Todas quedan en la caché de respuestas.
+    # Devuelve la lista de páginas o None si alguna falla.
+    try:
+        datos = _fetch(get_cache(), "GET", endpoint, headers=headers, params=params_pagina(0, tamano))
+    except ApiError as e:
+        if mostrar_errores:
+            mostrar_error_api(e)
+        return None
+    if isinstance(datos, list):
+        return [datos]  # El backend ignora la paginación y devuelve la lista completa
+    if not isinstance(datos, dict):
+        return None
+    primera = desde_respuesta(datos, 0, tamano)
+    resultados = fetch_many(
+        [ApiRequest("GET", endpoint, params=params_pagina(numero, primera.tamano))
+         for numero in range(1, primera.total_paginas)],
+        headers=headers, mostrar_errores=mostrar_errores,
+    )
+    if not all(resultado.ok for resultado in resultados):
+        return None
+    return [primera.items] + [desde_respuesta(r.data, 0, primera.tamano).items for r in resultados]
+
+def cargar_listado(recurso, headers, tamano):
+    # Como cargar_paginas, pero para los listados con copia local (exámenes y preguntas).
+    # Si hay una instantánea vigente se sirve al momento y, cuando envejece, se refresca
+    # en segundo plano; si no, se descarga y se guarda una nueva. Si el backend falla se
+    # sirve la última instantánea aunque una escritura la haya invalidado.
+    # Devuelve (páginas o None, instantánea servida o None).
+    endpoint = ENDPOINTS[recurso]
+    almacen = get_instantaneas()
+    if almacen is None:
+        return cargar_paginas(endpoint, headers, tamano), None
+    rol = (headers or {}).get("X-Role")
+    instantanea = almacen.vigente(recurso, rol)
+    if instantanea is not None:
+        if instantanea.edad() > almacen.refresco:
+            almacen.refrescar_en_segundo_plano(
+                recurso, rol, obtenedor_http(get_client(), build_url(endpoint), headers)
+            )
+        return instantanea.paginas, instantanea
+
+    respaldo = almacen.obtener(recurso, rol)
+    paginas = cargar_paginas(endpoint, headers, tamano, mostrar_errores=respaldo is None)
+    if paginas is not None:
+        almacen.guardar_en_segundo_plano(recurso, rol, paginas, tamano)
+        return paginas, None
+    if respaldo is None:
+        return None, None
+    almacen.registrar_error(recurso, rol, "El backend no respondió")
+    return respaldo.paginas, respaldo
+
+def _hace(segundos):
+    if segundos < 90:
+        return f"{segundos:.0f} s"
+    if segundos < 90 * 60:
+        return f"{segundos / 60:.0f} min"
+    if segundos < 36 * 3600:
+        return f"{segundos / 3600:.0f} h"
+    return f"{segundos / 86400:.0f} días"
+
+def aviso_instantanea(instantanea, que):
+    # Marca de antigüedad cuando `que` se sirve desde la copia local
+    if instantanea is None:
+        return
+    almacen = get_instantaneas()
+    edad = _hace(instantanea.edad())
+    if almacen.error(instantanea.recurso, instantanea.rol) is not None:
+        guardada = datetime.fromtimestamp(instantanea.guardada_en)
+        st.warning(f"⚠️ Sin conexión con el backend: {que} de la copia local del "
+                   f"{guardada:%d/%m/%Y %H:%M} (hace {edad}); pueden no estar al día.")
+    elif instantanea.edad() > almacen.refresco:
+        st.caption(f"📦 {que} de la copia local de hace {edad}; actualizando en segundo plano.")
+
+def derivado_de_paginas(nombre, headers, paginas, construir):
+    # Devuelve la estructura `nombre` del rol construida con `construir()`, que sólo
+    # se vuelve a llamar cuando el contenido de las páginas cambia
+    # construir() se ejecuta fuera del cerrojo: dos sesiones pueden construir a la vez
+    # la misma estructura, pero ninguna espera a que termine la de otra
+    derivados, lock = get_derivados()
+    clave = (nombre, (headers or {}).get("X-Role"))
+    with lock:
+        actual = derivados.get(clave)
+    if actual is not None:
+        paginas_previas, huella_previa, valor = actual
+        # Mientras la caché devuelva los mismos objetos no hace falta ni calcular la huella
+        if len(paginas) == len(paginas_previas) and all(a is b for a, b in zip(paginas, paginas_previas)):
+            return valor
+        huella = hashlib.sha1(json_codec.dumps(paginas)).digest()
+        if huella == huella_previa:
+            with lock:
+                derivados[clave] = (paginas, huella, valor)
+            return valor
+    else:
+        huella = hashlib.sha1(json_codec.dumps(paginas)).digest()
+    with REGISTRO.medir("evaluapp_construccion_segundos", estructura=nombre):
+        valor = construir()
+    with lock:
+        derivados[clave] = (paginas, huella, valor)
+    return valor
+
+def estado_tabla(clave):
+    # Página, tamaño y orden de una tabla paginada, según sus controles en el rerun
+    # anterior; si cambian el orden o el tamaño se vuelve a la primera página
+    tamano = st.session_state.get(f"{clave}_tamano", TAMANOS_PAGINA_TABLA[0])
+    orden = st.session_state.get(f"{clave}_orden")
+    direccion = st.session_state.get(f"{clave}_direccion", "asc")
+    if st.session_state.get(f"{clave}_criterio") != (orden, direccion, tamano):
+        st.session_state[f"{clave}_criterio"] = (orden, direccion, tamano)
+        st.session_state[f"{clave}_pagina"] = 0
+    sort = f"{orden},{direccion}" if orden else None
+    return st.session_state.get(f"{clave}_pagina", 0), tamano, sort
+
+def cargar_pagina_listado(endpoint, headers, numero, tamano, sort=None, campos=None):
+    # Una página de un listado con orden y proyección; si el backend ignora los
+    # parámetros se ordena, proyecta y pagina aquí. None si falla la carga.
+    datos = make_request("GET", endpoint, headers=headers,
+                         params=params_pagina(numero, tamano, sort=sort, campos=campos))
+    if isinstance(datos, list) and sort:
+        datos = ordenar_local(datos, sort)
+    if not isinstance(datos, (list, dict)):
+        return None
+    pagina = desde_respuesta(datos, numero, tamano)
+    pagina.items = proyectar(pagina.items, campos)
+    return pagina
+
+def tabla_paginada(clave, endpoint, headers, campos=None):
+    # Tabla que sólo descarga y muestra la página actual del listado; devuelve el
+    # DataFrame de esa página o None si falla la carga
+    import pandas as pd
+
+    numero, tamano, sort = estado_tabla(clave)
+    pagina = cargar_pagina_listado(endpoint, headers, numero, tamano, sort, campos)
+    if pagina is not None and not pagina.items and numero > 0:
+        # La página desapareció (p. ej. tras eliminar registros): ir a la última
+        numero = st.session_state[f"{clave}_pagina"] = max(0, pagina.total_paginas - 1)
+        pagina = cargar_pagina_listado(endpoint, headers, numero, tamano, sort, campos)
+    if pagina is None:
+        return None
+
+    with REGISTRO.medir("evaluapp_construccion_segundos", estructura=clave):
+        df = pd.DataFrame(pagina.items, columns=campos or None)
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    col_anterior, col_info, col_siguiente = st.columns([1, 3, 1])
+    col_anterior.button("⬅️ Anterior", key=f"{clave}_anterior", disabled=not pagina.hay_anterior,
+                        on_click=ir_a_pagina, args=(f"{clave}_pagina", pagina.numero - 1))
+    col_info.write(f"Página {pagina.numero + 1} de {pagina.total_paginas} · {pagina.total_elementos:,} registros")
+    col_siguiente.button("Siguiente ➡️", key=f"{clave}_siguiente", disabled=not pagina.hay_siguiente,
+                         on_click=ir_a_pagina, args=(f"{clave}_pagina", pagina.numero + 1))
+
+    col_orden, col_direccion, col_tamano = st.columns(3)
+    col_orden.selectbox("Ordenar por", [None] + list(campos or df.columns), key=f"{clave}_orden",
+                        format_func=lambda c: "Sin ordenar" if c is None else c)
+    col_direccion.selectbox("Dirección", ["asc", "desc"], key=f"{clave}_direccion",
+                            format_func={"asc": "Ascendente", "desc": "Descendente"}.get)
+    col_tamano.selectbox("Filas por página", TAMANOS_PAGINA_TABLA, key=f"{clave}_tamano")
+    return df
+
 # ---------------- Función principal de creación -------------------
+def get_indice_preguntas(headers):
+    # Índice del banco de preguntas del rol; sólo se reconstruye si el banco cambió
+    paginas, instantanea = cargar_listado("preguntas", headers, BANCO_PREGUNTAS_TAMANO_PAGINA)
+    aviso_instantanea(instantanea, "Banco de preguntas")
+    if paginas is None:
+        return None
+    return derivado_de_paginas(
+        "indice_preguntas", headers, paginas,
+        lambda: IndicePreguntas(pregunta for pagina in paginas for pregunta in pagina),
+    )
+
+def alternar_pregunta(pregunta_id):
+    # Callback de cada casilla del buscador
+    seleccion = st.session_state.preguntas_seleccionadas
+    if st.session_state.get(f"sel_pregunta_{pregunta_id}"):
+        seleccion.add(pregunta_id)
+    else:
+        seleccion.discard(pregunta_id)
+
+def limpiar_seleccion_preguntas():
+    st.session_state.preguntas_seleccionadas = set()
+    for clave in [c for c in st.session_state if str(c).startswith("sel_pregunta_")]:
+        del st.session_state[clave]
+
+def selector_preguntas(indice):
+    # Buscador del banco de preguntas: la búsqueda se resuelve en el índice del
+    # servidor y al navegador sólo llegan los resultados de la página actual
+    seleccion = st.session_state.setdefault("preguntas_seleccionadas", set())
+    col_busqueda, col_tipo = st.columns([3, 1])
+    consulta = col_busqueda.text_input(
+        "Buscar preguntas", key="busqueda_preguntas", placeholder="Escribe parte del enunciado..."
+    )
+    tipo = col_tipo.selectbox(
+        "Tipo", [None] + indice.tipos(), key="filtro_tipo_preguntas",
+        format_func=lambda t: "Todos" if t is None else t,
+    )
+
+    # Una búsqueda nueva vuelve a la primera página de resultados
+    clave_pagina = "pagina_busqueda_preguntas"
+    if st.session_state.get("criterio_busqueda_preguntas") != (consulta, tipo):
+        st.session_state.criterio_busqueda_preguntas = (consulta, tipo)
+        st.session_state[clave_pagina] = 0
+    numero = st.session_state.get(clave_pagina, 0)
+    resultado = indice.buscar(consulta, tipo, limite=BANCO_PREGUNTAS_RESULTADOS,
+                              desplazamiento=numero * BANCO_PREGUNTAS_RESULTADOS)
+    pagina = Pagina(items=resultado.ids, numero=numero, tamano=BANCO_PREGUNTAS_RESULTADOS,
+                    total_elementos=resultado.total)
+
+    st.caption(f"{resultado.total} preguntas encontradas · {len(seleccion)} seleccionadas")
+    for pregunta_id in pagina.items:
+        texto = indice.preguntas[pregunta_id]["texto"]
+        st.checkbox(
+            f"#{pregunta_id} · {texto[:150]}",
+            value=pregunta_id in seleccion,
+            key=f"sel_pregunta_{pregunta_id}",
+            on_change=alternar_pregunta,
+            args=(pregunta_id,),
+        )
+
+    col_anterior, col_info, col_siguiente, col_limpiar = st.columns([1, 2, 1, 1])
+    col_anterior.button("⬅️ Anterior", key="busqueda_preguntas_anterior", disabled=not pagina.hay_anterior,
+                        on_click=ir_a_pagina, args=(clave_pagina, numero - 1))
+    col_info.write(f"Página {numero + 1} de {pagina.total_paginas}")
+    col_siguiente.button("Siguiente ➡️", key="busqueda_preguntas_siguiente", disabled=not pagina.hay_siguiente,
+                         on_click=ir_a_pagina, args=(clave_pagina, numero + 1))
+    col_limpiar.button("Limpiar selección", key="limpiar_seleccion_preguntas", disabled=not seleccion,
+                       on_click=limpiar_seleccion_preguntas)
+    return seleccion
+
 def crear_examen():
     st.subheader("➕ Crear Nuevo Examen")
+    # Resultado de la última creación, guardado antes del rerun
+    for ok, mensaje in st.session_state.pop("mensajes_crear_examen", []):
+        (st.success if ok else st.error)(mensaje)
 
-    # Obtener preguntas disponibles
-    preguntas_disponibles = make_request("GET", ENDPOINTS["preguntas"], headers=get_headers())
-    # st.write("Debug - Preguntas disponibles:", preguntas_disponibles) # <-- LÍNEA DE DEPURACIÓN ELIMINADA
-    
-    if preguntas_disponibles is None or not preguntas_disponibles: # Añadida comprobación de lista vacía
+    indice = get_indice_preguntas(get_headers())
+    if not indice:
         st.error("No se pudieron cargar las preguntas o no hay preguntas disponibles. Inténtalo de nuevo más tarde o añade preguntas primero.")
-        # Opcionalmente, podrías permitir crear el examen sin preguntas si es válido
-        # preguntas_disponibles = [] 
-        return # O decidir no continuar si las preguntas son cruciales
+        return
 
-    # Crear un mapeo de enunciado de pregunta a ID de pregunta
-    # La API devuelve 'id' y 'textoPregunta'
-    pregunta_options = {pregunta['textoPregunta']: pregunta['id'] for pregunta in preguntas_disponibles}
+    # Selector de preguntas (fuera del formulario para buscar mientras se escribe)
+    seleccion = selector_preguntas(indice)
 
     with st.form(key="form_create_exam", clear_on_submit=True):
         titulo = st.text_input("Título del Examen")
         descripcion = st.text_area("Descripción")
         fecha_inicio = st.date_input("Fecha de Inicio", datetime.now().date())
-        fecha_fin = st.date_input("Fecha de Fin", datetime.now().date() + pd.Timedelta(days=7))
-        
-        # Selector de preguntas
-        selected_enunciados = st.multiselect(
-            "Seleccionar Preguntas",
-            options=list(pregunta_options.keys()),
-            help="Selecciona las preguntas que formarán parte de este examen."
-        )
+        fecha_fin = st.date_input("Fecha de Fin", datetime.now().date() + timedelta(days=7))
+        st.write(f"Preguntas seleccionadas: {len(seleccion)}")
 
         if st.form_submit_button("Crear Examen"):
             if not titulo:
@@ -147,12 +482,12 @@ def crear_examen():
             if fecha_inicio >= fecha_fin:
                 st.error("La fecha de inicio debe ser anterior a la de fin")
                 return
-            if not selected_enunciados: # Opcional: requerir al menos una pregunta
+            if not seleccion: # Opcional: requerir al menos una pregunta
                 st.warning("Es recomendable seleccionar al menos una pregunta para el examen.")
                 # Podrías decidir si esto es un error o solo una advertencia
 
-            # Obtener los IDs de las preguntas seleccionadas
-            preguntas_seleccionadas_ids = [pregunta_options[enunciado] for enunciado in selected_enunciados]
+            # IDs de las preguntas seleccionadas en el buscador
+            preguntas_seleccionadas_ids = sorted(seleccion)
 
             try:
                 creador_id = 1  # ⚠️ Temporal — reemplazar por el ID del usuario actual logueado
@@ -181,45 +516,36 @@ def crear_examen():
 
                 if result:
                     examen_id = result.get("id")
-                    st.success(f"✅ Examen creado con éxito. ID: {examen_id}")
+                    mensajes = [(True, f"✅ Examen creado con éxito. ID: {examen_id}")]
+                    limpiar_seleccion_preguntas()
                     
                     # Ahora asociar las preguntas al examen
                     if preguntas_seleccionadas_ids:
                         st.write("\nAsociando preguntas al examen...")
                         st.write(f"IDs de preguntas a asociar: {preguntas_seleccionadas_ids}")
-                        
+                        asociacion = payload_asociacion(examen_id, preguntas_seleccionadas_ids)
+
                         # Hacer la petición para asociar las preguntas
                         preguntas_result = make_request(
                             "POST",
                             f"{ENDPOINTS['examenes']}/{examen_id}/preguntas",
                             headers=get_headers(),
-                            data={
-                                "src": {
-                                    "examenId": examen_id,
-                                    "preguntas": [
-                                        {"id": id} for id in preguntas_seleccionadas_ids
-                                    ]
-                                }
-                            }
+                            data=asociacion
                         )
-                        
+
                         # Mostrar el JSON que se está enviando
                         st.write("JSON enviado para asociar preguntas:")
-                        st.json({
-                            "src": {
-                                "examenId": examen_id,
-                                "preguntas": [
-                                    {"id": id} for id in preguntas_seleccionadas_ids
-                                ]
-                            }
-                        }, expanded=True)
-                        
+                        st.json(asociacion, expanded=True)
+
                         if preguntas_result:
-                            st.success("✅ Preguntas asociadas al examen con éxito")
+                            mensajes.append((True, "✅ Preguntas asociadas al examen con éxito"))
                         else:
-                            st.error("❌ Error al asociar las preguntas al examen")
-                            st.write("Respuesta del backend:")
-                            st.json(preguntas_result)
+                            mensajes.append((False, "❌ Error al asociar las preguntas al examen"))
+
+                    # Rerun de toda la app: el listado y los selectores de exámenes están
+                    # fuera de este fragmento y si no seguirían sin el examen nuevo
+                    st.session_state.mensajes_crear_examen = mensajes
+                    st.rerun()
                 else:
                     st.error("❌ Error al crear el examen")
                     st.write("Respuesta del backend:")
@@ -230,352 +556,830 @@ def crear_examen():
                 st.write("Detalles del error:")
                 st.write(str(e))
 
-                if result:
-                    st.success("✅ Examen creado con éxito")
-                    st.json(result)
-                    st.rerun()
+# ----------------- Secciones de la interfaz -----------------
+def seccion(func=None, *, run_every=None):
+    # Fragmento de Streamlit: una interacción dentro de la sección sólo vuelve a
+    # ejecutar esta función, no todo main(). Se mide cada ejecución.
+    if func is None:
+        return functools.partial(seccion, run_every=run_every)
+
+    @functools.wraps(func)
+    def medida(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            with en_seccion(func.__name__):
+                return func(*args, **kwargs)
+        finally:
+            registrar_tiempo_seccion(func.__name__, time.perf_counter() - inicio)
+    return st.fragment(medida, run_every=run_every)
+
+def registrar_tiempo_seccion(nombre, segundos):
+    tiempos = st.session_state.setdefault("tiempos_secciones", {})
+    registro = tiempos.setdefault(nombre, {"ejecuciones": 0, "ultima_ms": 0.0, "max_ms": 0.0})
+    registro["ejecuciones"] += 1
+    registro["ultima_ms"] = round(segundos * 1000, 1)
+    registro["max_ms"] = max(registro["max_ms"], registro["ultima_ms"])
+    REGISTRO.observar("evaluapp_seccion_segundos", segundos, seccion=nombre)
+
+@seccion
+def seccion_crear_examen():
+    crear_examen()
+
+@seccion
+def seccion_importar_examenes(headers):
+    # 📥 Importación masiva desde CSV, JSON o JSON Lines
+    import pandas as pd
+
+    st.subheader("📥 Importar exámenes")
+    with st.expander("Importar desde un fichero"):
+        st.caption(
+            "Columnas: titulo, descripcion, fechaInicio, fechaFin (AAAA-MM-DD), creadorId (opcional) y "
+            "preguntasIds (en CSV separados por ';'). Si la importación se interrumpe, vuelve a subir el "
+            "mismo fichero para continuar donde se quedó."
+        )
+        fichero = st.file_uploader("Fichero de exámenes", type=["csv", "json", "jsonl", "ndjson"],
+                                   key="importacion_fichero")
+        creador_id = st.number_input("Creador por defecto", min_value=1, value=1, step=1,
+                                     key="importacion_creador")
+        if fichero is None:
+            return
+        try:
+            formato = formato_de(fichero.name)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+
+        col_importar, col_reiniciar = st.columns(2)
+        if col_reiniciar.button("Olvidar el progreso de este fichero", key="importacion_reiniciar"):
+            get_importador().olvidar(huella_fichero(fichero))
+            st.success("El próximo intento importará el fichero desde el principio")
+        if col_importar.button("Importar", key="importacion_iniciar"):
+            # Las preguntas se validan contra el banco si está disponible
+            indice = get_indice_preguntas(headers)
+            progreso = st.empty()
+            procesadas = []
+
+            def al_avanzar(resultados):
+                procesadas.extend(resultados)
+                progreso.info(f"⏳ {len(procesadas)} filas procesadas...")
+
+            try:
+                informe = get_importador().importar(
+                    fichero, formato, headers=headers, creador_por_defecto=int(creador_id),
+                    preguntas_validas=indice.preguntas if indice else None, al_avanzar=al_avanzar,
+                )
+            except ValueError as e:
+                progreso.error(f"❌ No se pudo leer el fichero: {e}")
+                return
+            # Rerun de toda la app para que el listado y los selectores de exámenes,
+            # fuera de este fragmento, incluyan los importados; el informe se conserva
+            st.session_state.informe_importacion = (fichero.file_id, informe)
+            st.rerun()
+
+        fichero_informe, informe = st.session_state.get("informe_importacion", (None, None))
+        if fichero_informe != fichero.file_id:
+            return
+        conteo = {estado: sum(1 for r in informe if r.estado == estado) for estado in (COMPLETADO, INVALIDO, ERROR)}
+        pendientes = len(informe) - sum(conteo.values())
+        st.write(
+            f"✅ {conteo[COMPLETADO]} importados · ⚠️ {conteo[INVALIDO]} inválidos · "
+            f"❌ {conteo[ERROR] + pendientes} con error"
+        )
+        if conteo[ERROR] or pendientes:
+            st.warning("Vuelve a pulsar \"Importar\" con el mismo fichero para reintentar las filas con error.")
+        st.dataframe(pd.DataFrame([r.to_dict() for r in informe]), use_container_width=True)
+        st.download_button("Descargar informe", informe_csv(informe), file_name="informe_importacion.csv",
+                           mime="text/csv", key="importacion_informe")
+
+@seccion
+def seccion_eliminar_examen(df, headers):
+    # 🗑️ Eliminar examen
+    st.subheader("🗑️ Eliminar examen")
+    exam_id_delete = st.selectbox("Selecciona un examen para eliminar", df["id"], key="delete_exam_select")
+    exam_titulo_delete = df[df["id"] == exam_id_delete]["titulo"].iloc[0]
+
+    with st.expander("⚠️ Confirmar eliminación de examen"):
+        st.warning(f"Estás a punto de eliminar el examen: **{exam_titulo_delete}** (ID: {exam_id_delete})")
+        confirmar = st.radio("¿Estás seguro?", ["No", "Sí"], index=0, horizontal=True)
+
+        if confirmar == "Sí":
+            if st.button("✅ Confirmar eliminación"):
+                try:
+                    response = get_client().delete(build_url(f"{ENDPOINTS['examenes']}/{exam_id_delete}"), headers=headers)
+                except Exception as e:
+                    st.error(f"❌ Error al eliminar el examen: {str(e)}")
                 else:
-                    st.error("❌ Error al crear el examen")
-                    st.write("Respuesta del backend:")
-                    st.json(result)
+                    if response.status_code == 204:  # No Content (eliminación exitosa)
+                        invalidar_lecturas(get_cache(), ENDPOINTS['examenes'])
+                        st.success(f"✅ Examen ID {exam_id_delete} eliminado con éxito")
+                        st.rerun()
+                    else:
+                        st.error(f"❌ Error al eliminar el examen. Código: {response.status_code}")
 
-            except Exception as e:
-                st.error(f"⚠️ Error inesperado: {str(e)}")
+@seccion
+def seccion_ver_preguntas(df, headers):
+    # 🔍 Selección para ver preguntas
+    import pandas as pd
 
-# ----------------- Menú Principal -----------------
-def main():
-    st.title("📊 EvaluApp - Panel de Control")
-    role = select_role()
-    if not role:
-        st.warning("Por favor selecciona tu rol para continuar")
+    st.subheader("🔍 Ver preguntas de un examen")
+    exam_id = st.selectbox("Selecciona un examen", df["id"], key="view_exam_select")
+    exam_titulo = df[df["id"] == exam_id]["titulo"].iloc[0]
+    st.write(f"Título: {exam_titulo}")
+
+    if exam_id:
+        preguntas = make_request("GET", f"{ENDPOINTS['examenes']}/{exam_id}/preguntas", headers=headers)
+        if preguntas is not None:
+            if isinstance(preguntas, list):
+                if preguntas:  # Verifica que la lista no esté vacía
+                    st.success(f"📋 Preguntas del examen ID {exam_id} {exam_titulo}")
+                    st.dataframe(pd.DataFrame(preguntas), use_container_width=True)
+                else:
+                    st.warning(f"⚠️ Este examen no tiene preguntas registradas. ID: {exam_id}, Título: {exam_titulo}")
+            else:
+                st.error(f"❌ Error en la respuesta del servidor. Tipo recibido: {type(preguntas)}")
+                st.write(f"Datos recibidos: {str(preguntas)[:500]}...")
+        else:
+            st.error("❌ Error al obtener las preguntas del examen")
+            st.write(f"Endpoint usado: {ENDPOINTS['examenes']}/{exam_id}/preguntas")
+            st.write(f"Headers: {headers}")
+
+def get_indice_opciones(examen_id, pagina, preguntas):
+    # Índice (pregunta, texto) -> opción por examen, reutilizado en los reruns; cada
+    # página de preguntas se incorpora una sola vez mientras su lista no cambie
+    indices = st.session_state.setdefault("indices_opciones", {})
+    entrada = indices.setdefault(examen_id, {"paginas": {}, "indice": IndiceOpciones()})
+    if entrada["paginas"].get(pagina) is not preguntas:
+        entrada["paginas"][pagina] = preguntas
+        entrada["indice"].agregar(preguntas)
+    return entrada["indice"]
+
+def completar_indice_opciones(examen_id, total_paginas, headers):
+    # Con paginación en el servidor el índice sólo tiene las páginas visitadas: antes
+    # de enviar se piden en paralelo las que faltan. Devuelve el índice o None si falla
+    entrada = st.session_state["indices_opciones"][examen_id]
+    faltan = [numero for numero in range(total_paginas) if numero not in entrada["paginas"]]
+    resultados = fetch_many([
+        ApiRequest("GET", endpoint_preguntas_examen(examen_id), params=params_pagina(numero, PREGUNTAS_POR_PAGINA))
+        for numero in faltan
+    ], headers=headers)
+    if not all(resultado.ok for resultado in resultados):
+        return None
+    for numero, resultado in zip(faltan, resultados):
+        get_indice_opciones(examen_id, numero, desde_respuesta(resultado.data, numero, PREGUNTAS_POR_PAGINA).items)
+    return entrada["indice"]
+
+def respuestas_del_examen(examen_id, indice):
+    # Respuestas de las preguntas del examen: las de las páginas ya cargadas y las
+    # restauradas del borrador (que pueden ser de páginas aún no visitadas)
+    preguntas = indice.preguntas | st.session_state.get("preguntas_borrador", {}).get(examen_id, set())
+    return {
+        pregunta_id: respuesta
+        for pregunta_id, respuesta in st.session_state.respuestas.items()
+        if pregunta_id in preguntas
+    }
+
+def endpoint_preguntas_examen(examen_id):
+    return f"{ENDPOINTS['examenes']}/{examen_id}/preguntas"
+
+def cargar_pagina_preguntas(examen_id, numero, headers):
+    # Devuelve (página, lista usada para el índice) o (None, None) si falla la carga
+    endpoint = endpoint_preguntas_examen(examen_id)
+    if PAGINACION_PREGUNTAS_SERVIDOR:
+        datos = make_request("GET", endpoint, headers=headers,
+                             params=params_pagina(numero, PREGUNTAS_POR_PAGINA))
+    else:
+        datos = make_request("GET", endpoint, headers=headers)
+    if not isinstance(datos, (list, dict)):
+        return None, None
+    pagina = desde_respuesta(datos, numero, PREGUNTAS_POR_PAGINA)
+    # Con la lista completa en memoria el índice se construye de una vez
+    return pagina, (pagina.items if isinstance(datos, dict) else datos)
+
+def precargar_pagina_preguntas(examen_id, numero, headers):
+    # Pide en segundo plano la página siguiente para que esté en caché al avanzar
+    if not PAGINACION_PREGUNTAS_SERVIDOR:
+        return  # La lista completa ya está en memoria
+    cache = get_cache()
+    get_client().executor.submit(
+        _fetch, cache, "GET", endpoint_preguntas_examen(examen_id), headers=headers,
+        params=params_pagina(numero, PREGUNTAS_POR_PAGINA),
+    )
+
+def ir_a_pagina(clave_pagina, numero):
+    # Callback de los botones de navegación: se ejecuta antes del rerun de la sección
+    st.session_state[clave_pagina] = numero
+
+def restaurar_borrador(examen_id):
+    # La primera vez que se abre el examen en la sesión se recuperan las respuestas guardadas
+    restaurados = st.session_state.setdefault("borradores_restaurados", set())
+    if examen_id in restaurados:
         return
+    restaurados.add(examen_id)
+    borrador = get_borradores().cargar(get_estudiante_id(), examen_id)
+    st.session_state.setdefault("preguntas_borrador", {})[examen_id] = set(borrador)
+    for pregunta_id, respuesta in borrador.items():
+        st.session_state.respuestas.setdefault(pregunta_id, respuesta)
+    if borrador:
+        st.toast("📝 Se restauraron tus respuestas guardadas")
 
-    # Definir el menú según el rol
-    if role == "admin":
-        menu = ["Inicio", "Exámenes", "Resultados", "Usuarios", "Configuración"]
-    elif role == "student":
-        menu = ["Inicio", "Realizar Examen", "Resultados"]
+def autoguardar_borrador(examen_id, indice):
+    # Sólo se programa una escritura (agrupada y diferida) si las respuestas cambiaron
+    actuales = respuestas_del_examen(examen_id, indice)
+    clave = f"borrador_guardado_{examen_id}"
+    if st.session_state.get(clave) != actuales:
+        st.session_state[clave] = actuales
+        get_borradores().guardar(get_estudiante_id(), examen_id, actuales)
+
+def mostrar_pregunta(pregunta):
+    # Los widgets de páginas no visibles se descartan: el valor inicial se restaura
+    # desde st.session_state.respuestas
+    guardada = st.session_state.respuestas.get(pregunta['id'], {}).get('respuesta')
+    tipo = pregunta.get('tipo')
+    with st.expander(f"Pregunta {pregunta['id']}: {pregunta['texto']}"):
+        # Mostrar las opciones
+        textos = [opt['texto'] for opt in pregunta.get('opciones', [])]
+
+        # Determinar el tipo de pregunta
+        if tipo == 'SELECCION_UNICA':
+            # Pregunta de selección única
+            respuesta = st.radio(
+                "Selecciona una opción",
+                options=textos,
+                index=textos.index(guardada) if guardada in textos else None,
+                key=f"pregunta_{pregunta['id']}",
+                help="Selecciona una sola opción"
+            )
+        elif tipo == 'MULTIPLE':
+            # Pregunta de selección múltiple
+            respuesta = st.multiselect(
+                "Selecciona las opciones correctas",
+                options=textos,
+                default=[texto for texto in (guardada or []) if texto in textos],
+                key=f"pregunta_{pregunta['id']}",
+                help="Selecciona todas las opciones correctas"
+            )
+        elif tipo == 'TEXTO_ABIERTO':
+            # Pregunta de texto abierto
+            respuesta = st.text_area(
+                "Escribe tu respuesta",
+                value=guardada or "",
+                key=f"pregunta_{pregunta['id']}",
+                help="Escribe tu respuesta aquí"
+            )
+        else:
+            return
+
+    # Guardar la respuesta
+    if respuesta:
+        st.session_state.respuestas[pregunta['id']] = {'tipo': tipo, 'respuesta': respuesta}
     else:
-        menu = ["Inicio", "Exámenes", "Resultados"]
-    choice = st.sidebar.selectbox("Menú", menu)
-    headers = get_headers()
+        st.session_state.respuestas.pop(pregunta['id'], None)
 
-    if choice == "Inicio":
-        st.header("Bienvenido a EvaluApp")
+@seccion
+def seccion_realizar_examen(catalogo, activos, headers):
+    # Seleccionar examen para realizar (por id: los títulos se pueden repetir)
+    examen_id = st.selectbox(
+        "Selecciona un examen para realizar",
+        [examen.id for examen in activos],
+        format_func=lambda i: f"{catalogo.get(i).titulo} (ID: {i})",
+        key="examen_seleccionado"
+    )
 
-    elif choice == "Exámenes":
-        st.header("📝 Gestión de Exámenes")
+    if examen_id is not None:
+        examen_seleccionado = catalogo.get(examen_id).titulo
 
-        # Crear nuevo examen
-        crear_examen()
+        # Obtener sólo la página actual de preguntas del examen
+        clave_pagina = f"pagina_examen_{examen_id}"
+        pagina, preguntas_indice = cargar_pagina_preguntas(
+            examen_id, st.session_state.get(clave_pagina, 0), headers
+        )
 
-        st.subheader("📄 Exámenes Registrados")
-        examenes = make_request("GET", ENDPOINTS["examenes"], headers=headers)
+        if pagina is not None and pagina.total_elementos > 0:
+            # Mostrar el examen
+            st.subheader(f"Examen: {examen_seleccionado}")
 
-        if examenes:
-            df = pd.DataFrame(examenes)
+            # Inicializar el estado de las respuestas
+            if "respuestas" not in st.session_state:
+                st.session_state.respuestas = {}
+            indice = get_indice_opciones(
+                examen_id, pagina.numero if PAGINACION_PREGUNTAS_SERVIDOR else None, preguntas_indice
+            )
 
-            # 🛑 Ocultar columnas innecesarias
-            columnas_ocultas = ['creadorId', 'creadorNombre', 'preguntasIds']
-            df_visible = df.drop(columns=[col for col in columnas_ocultas if col in df.columns], errors='ignore')
+            restaurar_borrador(examen_id)
 
-            # ✅ Mostrar tabla limpia
-            st.dataframe(df_visible, use_container_width=True)
+            # Mostrar las preguntas de la página
+            for pregunta in pagina.items:
+                mostrar_pregunta(pregunta)
+            autoguardar_borrador(examen_id, indice)
 
-            # 🗑️ Eliminar examen
-            st.subheader("🗑️ Eliminar examen")
-            exam_id_delete = st.selectbox("Selecciona un examen para eliminar", df["id"], key="delete_exam_select")
-            exam_titulo_delete = df[df["id"] == exam_id_delete]["titulo"].iloc[0]
+            if pagina.hay_siguiente:
+                precargar_pagina_preguntas(examen_id, pagina.numero + 1, headers)
 
-            with st.expander("⚠️ Confirmar eliminación de examen"):
-                st.warning(f"Estás a punto de eliminar el examen: **{exam_titulo_delete}** (ID: {exam_id_delete})")
-                confirmar = st.radio("¿Estás seguro?", ["No", "Sí"], index=0, horizontal=True)
+            # Navegación entre páginas
+            if pagina.total_paginas > 1:
+                col_anterior, col_info, col_siguiente = st.columns([1, 2, 1])
+                col_info.write(f"Página {pagina.numero + 1} de {pagina.total_paginas}")
+                col_anterior.button("⬅️ Anterior", disabled=not pagina.hay_anterior, key="examen_anterior",
+                                    on_click=ir_a_pagina, args=(clave_pagina, pagina.numero - 1))
+                col_siguiente.button("Siguiente ➡️", disabled=not pagina.hay_siguiente, key="examen_siguiente",
+                                     on_click=ir_a_pagina, args=(clave_pagina, pagina.numero + 1))
 
-                if confirmar == "Sí":
-                    if st.button("✅ Confirmar eliminación"):
-                        response = requests.delete(build_url(f"{ENDPOINTS['examenes']}/{exam_id_delete}"), headers=headers)
-                        if response.status_code == 204:  # No Content (eliminación exitosa)
-                            st.success(f"✅ Examen ID {exam_id_delete} eliminado con éxito")
-                            st.rerun()
-                        else:
-                            st.error(f"❌ Error al eliminar el examen. Código: {response.status_code}")
-
-            # 🔍 Selección para ver preguntas
-            st.subheader("🔍 Ver preguntas de un examen")
-            exam_id = st.selectbox("Selecciona un examen", df["id"], key="view_exam_select")
-            exam_titulo = df[df["id"] == exam_id]["titulo"].iloc[0]
-            st.write(f"Título: {exam_titulo}")
-
-            if exam_id:
-                preguntas = make_request("GET", f"{ENDPOINTS['examenes']}/{exam_id}/preguntas", headers=headers)
-                if preguntas is not None:
-                    if isinstance(preguntas, list):
-                        if preguntas:  # Verifica que la lista no esté vacía
-                            st.success(f"📋 Preguntas del examen ID {exam_id} {exam_titulo}")
-                            st.dataframe(pd.DataFrame(preguntas), use_container_width=True)
-                        else:
-                            st.warning(f"⚠️ Este examen no tiene preguntas registradas. ID: {exam_id}, Título: {exam_titulo}")
-                    else:
-                        st.error(f"❌ Error en la respuesta del servidor. Tipo recibido: {type(preguntas)}")
-                        st.write(f"Datos recibidos: {str(preguntas)[:500]}...")
-                else:
-                    st.error("❌ Error al obtener las preguntas del examen")
-                    st.write(f"Endpoint usado: {ENDPOINTS['examenes']}/{exam_id}/preguntas")
-                    st.write(f"Headers: {headers}")
+            # Botón para enviar el examen
+            if st.button("Enviar examen"):
+                # Preparar el payload con el índice del examen, completo aunque no se
+                # hayan visitado todas las páginas
+                if PAGINACION_PREGUNTAS_SERVIDOR:
+                    indice = completar_indice_opciones(examen_id, pagina.total_paginas, headers)
+                    if indice is None:
+                        st.error("❌ No se pudieron cargar todas las preguntas del examen; inténtalo de nuevo")
+                        return
+                try:
+                    payload = construir_payload(examen_id, respuestas_del_examen(examen_id, indice), indice)
+                except ValueError as e:
+                    st.error(f"❌ {str(e)}")
+                    return
 
-    elif choice == "Realizar Examen":
-        if st.session_state.role != "student":
-            st.warning("Esta sección solo está disponible para estudiantes")
-            return
+                # Encolar el envío: se guarda localmente y se entrega en segundo plano.
+                # La clave de idempotencia se reutiliza si se pulsa otra vez el botón.
+                cola = get_cola_envios()
+                clave_envio = st.session_state.get(f"envio_{examen_id}")
+                estado_previo = cola.estado(clave_envio) if clave_envio else None
+                if estado_previo is None or estado_previo["estado"] == FALLIDO:
+                    clave_envio = st.session_state[f"envio_{examen_id}"] = nueva_clave_idempotencia()
+                try:
+                    cola.encolar(ENDPOINTS['results'], payload, headers=headers, clave=clave_envio)
+                except Exception as e:
+                    st.error(f"❌ Error al guardar el envío del examen: {str(e)}")
+                    return
+                # El envío ya está a salvo en la cola: el borrador deja de ser necesario
+                get_borradores().eliminar(get_estudiante_id(), examen_id)
+                st.session_state.envio_actual = clave_envio
+                st.rerun()
 
-        st.header("📝 Realizar Examen")
-        st.write("Selecciona un examen para realizarlo")
-
-        # Obtener exámenes disponibles
-        examenes = make_request("GET", ENDPOINTS["examenes"], headers=headers)
-        
-        if examenes:
-            df_examenes = pd.DataFrame(examenes)
-            
-            # Filtrar exámenes que están activos (fechaInicio <= hoy <= fechaFin)
-            hoy = date.today()
-            examenes_activos = df_examenes[
-                (pd.to_datetime(df_examenes["fechaInicio"]).dt.date <= hoy) &
-                (pd.to_datetime(df_examenes["fechaFin"]).dt.date >= hoy)
-            ]
-            
-            if len(examenes_activos) > 0:
-                # Mostrar exámenes activos
-                st.subheader("Exámenes disponibles")
-                st.dataframe(examenes_activos["titulo"], use_container_width=True)
-                
-                # Seleccionar examen para realizar
-                examen_seleccionado = st.selectbox(
-                    "Selecciona un examen para realizar",
-                    examenes_activos["titulo"],
-                    key="examen_seleccionado"
-                )
-                
-                if examen_seleccionado:
-                    # Obtener el ID del examen seleccionado
-                    examen_id = examenes_activos[examenes_activos["titulo"] == examen_seleccionado]["id"].iloc[0]
-                    
-                    # Obtener preguntas del examen
-                    preguntas = make_request(
-                        "GET",
-                        f"{ENDPOINTS['examenes']}/{examen_id}/preguntas",
-                        headers=headers
-                    )
-                    
-                    if preguntas and isinstance(preguntas, list):
-                        # Mostrar el examen
-                        st.subheader(f"Examen: {examen_seleccionado}")
-                        
-                        # Inicializar el estado de las respuestas
-                        if "respuestas" not in st.session_state:
-                            st.session_state.respuestas = {}
-                        
-                        # Mostrar cada pregunta
-                        for pregunta in preguntas:
-                            with st.expander(f"Pregunta {pregunta['id']}: {pregunta['texto']}"):
-                                # Mostrar las opciones
-                                opciones = pregunta.get('opciones', [])
-                                
-                                # Determinar el tipo de pregunta
-                                if pregunta.get('tipo') == 'SELECCION_UNICA':
-                                    # Pregunta de selección única
-                                    respuesta = st.radio(
-                                        "Selecciona una opción",
-                                        opciones=[opt['texto'] for opt in opciones],
-                                        key=f"pregunta_{pregunta['id']}",
-                                        help="Selecciona una sola opción"
-                                    )
-                                    
-                                    # Guardar la respuesta
-                                    if respuesta:
-                                        st.session_state.respuestas[pregunta['id']] = {
-                                            'tipo': 'SELECCION_UNICA',
-                                            'respuesta': respuesta
-                                        }
-                                elif pregunta.get('tipo') == 'MULTIPLE':
-                                    # Pregunta de selección múltiple
-                                    respuesta = st.multiselect(
-                                        "Selecciona las opciones correctas",
-                                        opciones=[opt['texto'] for opt in opciones],
-                                        key=f"pregunta_{pregunta['id']}",
-                                        help="Selecciona todas las opciones correctas"
-                                    )
-                                    
-                                    # Guardar la respuesta
-                                    if respuesta:
-                                        st.session_state.respuestas[pregunta['id']] = {
-                                            'tipo': 'MULTIPLE',
-                                            'respuesta': respuesta
-                                        }
-                                elif pregunta.get('tipo') == 'TEXTO_ABIERTO':
-                                    # Pregunta de texto abierto
-                                    respuesta = st.text_area(
-                                        "Escribe tu respuesta",
-                                        key=f"pregunta_{pregunta['id']}",
-                                        help="Escribe tu respuesta aquí"
-                                    )
-                                    
-                                    # Guardar la respuesta
-                                    if respuesta:
-                                        st.session_state.respuestas[pregunta['id']] = {
-                                            'tipo': 'TEXTO_ABIERTO',
-                                            'respuesta': respuesta
-                                        }
-                        
-                        # Botón para enviar el examen
-                        if st.button("Enviar examen"):                            
-                            # Preparar el payload para enviar las respuestas
-                            payload = {
-                                "examenId": examen_id,
-                                "opcionesSeleccionadas": []
-                            }
-                            
-                            # Procesar las respuestas según el tipo de pregunta
-                            for pregunta_id, respuesta in st.session_state.respuestas.items():
-                                if respuesta['tipo'] == 'SELECCION_UNICA':
-                                    # Para selección única, enviar el ID de la opción
-                                    opcion_id = next(
-                                        opt['id'] for opt in preguntas
-                                        if opt['texto'] == respuesta['respuesta']
-                                    )
-                                    payload["opcionesSeleccionadas"].append(opcion_id)
-                                elif respuesta['tipo'] == 'MULTIPLE':
-                                    # Para múltiple, enviar los IDs de las opciones
-                                    for respuesta_text in respuesta['respuesta']:
-                                        opcion_id = next(
-                                            opt['id'] for opt in preguntas
-                                            if opt['texto'] == respuesta_text
-                                        )
-                                        payload["opcionesSeleccionadas"].append(opcion_id)
-                                elif respuesta['tipo'] == 'TEXTO_ABIERTO':
-                                    # Para texto abierto, guardar la respuesta como texto
-                                    payload[f"texto_abierto_{pregunta_id}"] = respuesta['respuesta']
-                            
-                            # Enviar las respuestas al backend
-                            try:
-                                response = requests.post(
-                                    f"{API_BASE_URL}/{ENDPOINTS['results']}",
-                                    headers=headers,
-                                    json=payload
-                                )
-                                
-                                if response.status_code == 201:  # Created
-                                    st.success("✅ Examen enviado con éxito!")
-                                    st.write("Puedes ver tus resultados en la sección de Resultados")
-                                    st.rerun()
-                                else:
-                                    st.error(f"❌ Error al enviar el examen. Código: {response.status_code}")
-                                    st.write("Respuesta del servidor:")
-                                    st.write(response.text)
-                            except Exception as e:
-                                st.error(f"❌ Error al enviar el examen: {str(e)}")
-            else:
-                st.info("No hay exámenes disponibles actualmente")
-        else:
-            st.error("❌ Error al obtener la lista de exámenes")
+def mostrar_estado_envio(clave_envio):
+    estado = get_cola_envios().estado(clave_envio)
+    if estado is None:
+        return True
+    if estado["estado"] == ENVIADO:
+        st.success("✅ Examen enviado con éxito!")
+        st.write("Puedes ver tus resultados en la sección de Resultados")
+    elif estado["estado"] == FALLIDO:
+        st.error(f"❌ Error al enviar el examen tras {estado['intentos']} intentos: {estado['ultimo_error']}")
+    else:
+        st.info(f"📨 Examen recibido. Enviando al servidor... (intentos: {estado['intentos']})")
+        if estado["ultimo_error"]:
+            st.caption(f"Último error: {estado['ultimo_error']}. Se reintentará automáticamente.")
+        return False
+    return True
+
+@seccion(run_every=2)
+def seccion_estado_envio(clave_envio):
+    # Consulta periódica del estado mientras el envío está pendiente
+    if mostrar_estado_envio(clave_envio):
+        st.rerun()  # Estado final: dejar de consultar
+
+def get_tabla_resultados(headers):
+    # Tabla columnar de resultados del rol; sólo se reconstruye si los resultados cambiaron
+    from resultados import construir_tabla
+
+    paginas = cargar_paginas(ENDPOINTS["results"], headers, RESULTADOS_TAMANO_PAGINA)
+    if paginas is None:
+        return None
+    return derivado_de_paginas(
+        "tabla_resultados", headers, paginas,
+        lambda: construir_tabla([resultado for pagina in paginas for resultado in pagina]),
+    )
+
+def get_catalogo_examenes(headers):
+    # Catálogo tipado de exámenes del rol; sólo se reconstruye si la lista cambió
+    paginas, instantanea = cargar_listado("examenes", headers, CATALOGO_TAMANO_PAGINA)
+    aviso_instantanea(instantanea, "Exámenes")
+    if paginas is None:
+        return None
+    return derivado_de_paginas(
+        "catalogo_examenes", headers, paginas,
+        lambda: CatalogoExamenes(examen for pagina in paginas for examen in pagina),
+    )
 
-        # Mensaje adicional para estudiantes
-        st.info("No hay exámenes disponibles.")
-        st.markdown("---")
+def _por_id(datos, campo):
+    # {id: campo} de un listado (lista o página de Spring) para mostrar nombres en vez de ids
+    if isinstance(datos, dict):
+        datos = datos.get("content") or []
+    return {d.get("id"): d.get(campo) for d in datos or [] if isinstance(d, dict)}
 
-    elif choice == "Resultados":
-        # 1. Encabezado principal
-        st.header("📊 Resultados de Exámenes")
-        st.write("Aquí puedes ver los resultados de todos los exámenes realizados.")
+@seccion
+def seccion_resultados(headers):
+    from resultados import filtrar, distribucion_puntajes, resumen_por_examen, analisis_items
 
-        # 2. Sección de filtros
-        with st.expander("🔍 Filtros", expanded=True):
+    tabla = get_tabla_resultados(headers)
+    # Títulos de exámenes y nombres de usuarios para los filtros (si el rol puede verlos)
+    catalogo = get_catalogo_examenes(headers)
+    titulos = catalogo.titulos() if catalogo is not None else {}
+    (usuarios_r,) = fetch_many([ApiRequest("GET", ENDPOINTS["users"])], headers=headers, mostrar_errores=False)
+    nombres = _por_id(usuarios_r.data, "nombre") if usuarios_r.ok else {}
+    df = tabla.resultados if tabla is not None else None
+
+    # 2. Sección de filtros (se aplican al pulsar el botón)
+    with st.expander("🔍 Filtros", expanded=True):
+        with st.form("form_filtros_resultados", border=False):
             col1, col2, col3 = st.columns(3)
-            
+            hay_datos = df is not None and not df.empty
+
             # Filtro por examen
             with col1:
-                examenes = []  # Aquí irá la llamada a la API para obtener examenes
-                examen_seleccionado = st.selectbox(
+                examenes = list(df["examen"].cat.categories) if hay_datos else []
+                examen_seleccionado = st.multiselect(
                     "Examen",
                     examenes,
                     key="filtro_examen",
+                    format_func=lambda e: f"{titulos[e]} (ID: {e})" if e in titulos else str(e),
                     help="Selecciona el examen para ver sus resultados"
                 )
-            
+
             # Filtro por usuario
             with col2:
-                usuarios = []  # Aquí irá la llamada a la API para obtener usuarios
-                usuario_seleccionado = st.selectbox(
+                usuarios = list(df["usuario"].cat.categories) if hay_datos else []
+                usuario_seleccionado = st.multiselect(
                     "Usuario",
                     usuarios,
                     key="filtro_usuario",
+                    format_func=lambda u: f"{nombres[u]} (ID: {u})" if u in nombres else str(u),
                     help="Selecciona el usuario para ver sus resultados"
                 )
-            
-            # Filtro por fecha
+
+            # Filtro por fecha (por defecto, todo el rango de los resultados)
             with col3:
+                fechas = df["fecha"].dropna() if hay_datos else None
+                primera = fechas.min().date() if fechas is not None and len(fechas) else date.today()
+                ultima = fechas.max().date() if fechas is not None and len(fechas) else date.today()
                 fecha_inicio = st.date_input(
                     "Desde",
+                    value=primera,
                     key="filtro_fecha_inicio",
                     help="Fecha inicial para filtrar los resultados"
                 )
                 fecha_fin = st.date_input(
                     "Hasta",
+                    value=ultima,
                     key="filtro_fecha_fin",
                     help="Fecha final para filtrar los resultados"
                 )
 
-        # 3. Botón para aplicar filtros
-        if st.button(
-            "🔍 Filtrar resultados",
-            help="Aplica los filtros seleccionados para ver los resultados"
-        ):
-            # Aquí irá la lógica para aplicar los filtros
-            pass
-
-        # 4. Área de resultados
-        with st.container():
-            # 4.1 Mensaje informativo
-            if not examenes:
-                st.info("No hay exámenes disponibles en el sistema. Para ver resultados, necesitas:")
-                st.write("1. Crear un examen")
-                st.write("2. Tener usuarios registrados")
-                st.write("3. Que los usuarios realicen los exámenes")
-            else:
-                # 4.2 Tabla de resultados
-                st.subheader("📋 Lista de Resultados")
-                st.write("La tabla de resultados aparecerá aquí")
-
-        # 5. Mensajes de estado
-        with st.expander("⚙️ Estado de la operación", expanded=False):
-            if st.session_state.get("error_api"):
-                st.error(st.session_state.error_api)
-                st.session_state.error_api = None
-
-            if st.session_state.get("mensaje_exito"):
-                st.success(st.session_state.mensaje_exito)
-                st.session_state.mensaje_exito = None
-
-    elif choice == "Usuarios":
-        if st.session_state.role != "admin":
-            st.warning("Esta sección solo está disponible para administradores")
-            return
+            # 3. Botón para aplicar filtros
+            st.form_submit_button(
+                "🔍 Filtrar resultados",
+                help="Aplica los filtros seleccionados para ver los resultados"
+            )
 
-        st.header("👥 Gestión de Usuarios")
-        users = make_request("GET", ENDPOINTS["users"], headers=headers)
-        if users:
-            df = pd.DataFrame(users)
-            columns_to_hide = ['creadorId', 'CreadorNombre', 'preguntasIds']
-            df_display = df.drop(columns=[col for col in columns_to_hide if col in df.columns], errors='ignore')
-            st.dataframe(df_display, use_container_width=True)
-
-    elif choice == "Configuración":
-        if st.session_state.role != "admin":
-            st.warning("Esta sección solo está disponible para administradores")
+    # 4. Área de resultados
+    with st.container():
+        # 4.1 Mensaje informativo
+        if df is None:
+            st.error("❌ No se pudieron cargar los resultados")
+        elif df.empty:
+            st.info("Todavía no hay resultados en el sistema. Para ver resultados, necesitas:")
+            st.write("1. Crear un examen")
+            st.write("2. Tener usuarios registrados")
+            st.write("3. Que los usuarios realicen los exámenes")
+        else:
+            mascara = filtrar(tabla, examen_seleccionado, usuario_seleccionado, fecha_inicio, fecha_fin)
+            filtrados = df[mascara]
+            total_usuarios = len(nombres) or None
+
+            col_total, col_media, col_mediana, col_fin = st.columns(4)
+            col_total.metric("Resultados", f"{len(filtrados):,}")
+            col_media.metric("Puntaje medio", f"{filtrados['puntaje'].mean():.2f}" if len(filtrados) else "—")
+            col_mediana.metric("Mediana", f"{filtrados['puntaje'].median():.2f}" if len(filtrados) else "—")
+            completados = filtrados.loc[filtrados["completado"], "usuario"].nunique()
+            col_fin.metric("Usuarios que completaron", f"{completados / (total_usuarios or df['usuario'].nunique() or 1):.0%}")
+
+            if len(filtrados):
+                st.subheader("📈 Distribución de puntajes")
+                st.bar_chart(distribucion_puntajes(filtrados["puntaje"].to_numpy()))
+
+                st.subheader("📚 Resumen por examen")
+                resumen = resumen_por_examen(tabla, mascara, total_usuarios)
+                resumen.index = [str(titulos.get(e, e)) for e in resumen.index]
+                st.dataframe(resumen.style.format(
+                    {"media": "{:.2f}", "mediana": "{:.2f}", "desviacion": "{:.2f}", "finalizacion": "{:.0%}"}
+                ), use_container_width=True)
+
+                items = analisis_items(tabla, mascara)
+                if not items.empty:
+                    st.subheader("🧩 Análisis de preguntas")
+                    st.caption("Dificultad: proporción de aciertos. Discriminación: correlación entre acertar "
+                               "la pregunta y el puntaje total (valores bajos o negativos señalan preguntas a revisar).")
+                    st.dataframe(items.style.format({"dificultad": "{:.2f}", "discriminacion": "{:.2f}"}),
+                                 use_container_width=True)
+
+            # 4.2 Tabla de resultados (sólo las primeras filas llegan al navegador)
+            st.subheader("📋 Lista de Resultados")
+            visibles = filtrados.head(RESULTADOS_FILAS_TABLA).assign(
+                examen=lambda d: d["examen"].map(lambda e: str(titulos.get(e, e))),
+                usuario=lambda d: d["usuario"].map(lambda u: str(nombres.get(u, u))),
+            )
+            if len(filtrados) > RESULTADOS_FILAS_TABLA:
+                st.caption(f"Mostrando {RESULTADOS_FILAS_TABLA:,} de {len(filtrados):,} resultados")
+            st.dataframe(visibles, use_container_width=True, hide_index=True)
+
+    # 5. Mensajes de estado
+    with st.expander("⚙️ Estado de la operación", expanded=False):
+        if st.session_state.get("error_api"):
+            st.error(st.session_state.error_api)
+            st.session_state.error_api = None
+
+        if st.session_state.get("mensaje_exito"):
+            st.success(st.session_state.mensaje_exito)
+            st.session_state.mensaje_exito = None
+
+@seccion
+def seccion_exportar(headers):
+    # 📤 Exportación a CSV o Parquet para corrección offline y BI
+    st.subheader("📤 Exportar datos")
+    recursos = {"results": "Resultados", "examenes": "Exámenes"}
+    if st.session_state.role == "admin":
+        recursos["users"] = "Usuarios"
+    col_recurso, col_formato = st.columns(2)
+    recurso = col_recurso.selectbox("Datos", list(recursos), format_func=recursos.get, key="exportar_recurso")
+    formato = col_formato.selectbox("Formato", formatos_disponibles(), format_func=str.upper, key="exportar_formato")
+    if not st.button("Preparar exportación", key="exportar_preparar"):
+        return
+
+    # Datos recientes y sin pasar por la caché: cada página se escribe en un
+    # fichero temporal según llega y sólo el fichero terminado va al navegador
+    client = get_client()
+    url = build_url(ENDPOINTS[recurso])
+
+    def obtener(params):
+        return client.fetch_json("GET", url, headers=headers, params=params, condicional=False)
+
+    with tempfile.TemporaryFile() as destino:
+        try:
+            with st.spinner("Exportando..."):
+                total = exportar(iterar_paginas(obtener, EXPORTACION_TAMANO_PAGINA), formato, destino)
+        except ApiError as e:
+            mostrar_error_api(e)
+            return
+        except ErrorExportacion as e:
+            st.error(f"❌ {e}")
             return
+        destino.seek(0)
+        st.download_button(
+            f"⬇️ Descargar {total:,} filas",
+            destino.read(),
+            file_name=f"{recurso}.{formato}",
+            mime=MIME[formato],
+            key="exportar_descargar",
+        )
+
+# ----------------- Páginas -----------------
+def pagina_examenes(headers):
+    st.header("📝 Gestión de Exámenes")
+
+    # Precargar en paralelo lo que necesitan las secciones de la página (quedan en la
+    # caché); si ya hay un examen seleccionado de un rerun anterior, sus preguntas
+    # van en el mismo lote. Cada sección muestra sus propios errores.
+    exam_id_previo = st.session_state.get("view_exam_select")
+    numero, tamano, sort = estado_tabla("tabla_examenes")
+    peticiones = [
+        ApiRequest("GET", ENDPOINTS["examenes"], params=params_pagina(numero, tamano, sort, CAMPOS_EXAMENES)),
+    ]
+    almacen = get_instantaneas()
+    if almacen is None or almacen.vigente("preguntas", headers.get("X-Role")) is None:
+        # El banco sólo se pide si no hay una copia local que servir
+        peticiones.append(
+            ApiRequest("GET", ENDPOINTS["preguntas"], params=params_pagina(0, BANCO_PREGUNTAS_TAMANO_PAGINA))
+        )
+    if exam_id_previo is not None:
+        peticiones.append(ApiRequest("GET", f"{ENDPOINTS['examenes']}/{exam_id_previo}/preguntas"))
+    fetch_many(peticiones, headers=headers, mostrar_errores=False)
+
+    # Crear nuevo examen
+    seccion_crear_examen()
+    seccion_importar_examenes(headers)
+
+    st.subheader("📄 Exámenes Registrados")
+    # Sólo la página visible, con las columnas de CAMPOS_EXAMENES
+    df = tabla_paginada("tabla_examenes", ENDPOINTS["examenes"], headers, CAMPOS_EXAMENES)
+
+    if df is not None and not df.empty:
+        seccion_eliminar_examen(df, headers)
+        seccion_ver_preguntas(df, headers)
+
+def pagina_realizar_examen(headers):
+    import pandas as pd
+
+    if st.session_state.role != "student":
+        st.warning("Esta sección solo está disponible para estudiantes")
+        return
+
+    st.header("📝 Realizar Examen")
+    st.write("Selecciona un examen para realizarlo")
+    get_estudiante_id()
+
+    # Catálogo de exámenes con las fechas ya convertidas (se reconstruye sólo si cambia)
+    catalogo = get_catalogo_examenes(headers)
+
+    if catalogo is not None:
+        hoy = date.today()
+        activos = catalogo.activos(hoy)
+
+        # Estado del último envío de la sesión
+        clave_envio = st.session_state.get("envio_actual")
+        if clave_envio:
+            estado = get_cola_envios().estado(clave_envio)
+            if estado is not None and estado["estado"] not in (ENVIADO, FALLIDO):
+                # Pendiente: sólo lo muestra el fragmento, que lo consulta cada 2 s
+                seccion_estado_envio(clave_envio)
+            else:
+                mostrar_estado_envio(clave_envio)
+
+        if activos:
+            # Mostrar exámenes activos
+            st.subheader("Exámenes disponibles")
+            st.dataframe(
+                pd.DataFrame({"titulo": [e.titulo for e in activos], "cierra": [e.fecha_fin for e in activos]}),
+                use_container_width=True, hide_index=True,
+            )
+
+            # Responder el examen: cada respuesta sólo vuelve a ejecutar esta sección
+            seccion_realizar_examen(catalogo, activos, headers)
+        else:
+            st.info("No hay exámenes disponibles actualmente")
+
+        proximos = catalogo.proximos(hoy, limite=3)
+        if proximos:
+            st.caption("Próximos exámenes: " + " · ".join(
+                f"{e.titulo} (abre el {e.fecha_inicio:%d/%m/%Y})" for e in proximos
+            ))
+    else:
+        st.error("❌ Error al obtener la lista de exámenes")
+
+    # Mensaje adicional para estudiantes
+    st.info("No hay exámenes disponibles.")
+    st.markdown("---")
+
+def pagina_resultados(headers):
+    # 1. Encabezado principal
+    st.header("📊 Resultados de Exámenes")
+    st.write("Aquí puedes ver los resultados de todos los exámenes realizados.")
+
+    # Filtros y tabla: interactuar con ellos sólo vuelve a ejecutar esta sección
+    seccion_resultados(headers)
+
+    if st.session_state.role != "student":
+        seccion_exportar(headers)
+
+def pagina_usuarios(headers):
+    if st.session_state.role != "admin":
+        st.warning("Esta sección solo está disponible para administradores")
+        return
+
+    st.header("👥 Gestión de Usuarios")
+    # Sólo la página visible; USUARIOS_CAMPOS limita las columnas que se descargan
+    tabla_paginada("tabla_usuarios", ENDPOINTS["users"], headers, CAMPOS_USUARIOS)
+
+def pagina_configuracion():
+    import pandas as pd
+
+    if st.session_state.role != "admin":
+        st.warning("Esta sección solo está disponible para administradores")
+        return
+
+    st.header("⚙️ Configuración del Sistema")
+
+    # Estado de la conexión con el backend
+    st.subheader("🔌 Conexión con la API")
+    client = get_client()
+    config = client.config
+    pool = get_backend_pool()
+    circuitos = client.circuitos()
+    abiertos = sum(1 for breaker in circuitos.values() if breaker.estado != "cerrado")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Circuitos abiertos", f"{abiertos} / {len(pool.backends)}" if config.breaker_enabled else "desactivado")
+    col2.metric("Fallos consecutivos", max((breaker.fallos for breaker in circuitos.values()), default=0))
+    col3.metric("Plazo connect / read (s)", f"{config.connect_timeout} / {config.read_timeout}")
+    if config.timeouts_por_recurso:
+        st.write("Plazos por recurso (connect, read):", config.timeouts_por_recurso)
+    st.write(f"Réplicas del backend (estrategia: {pool.strategy}):")
+    estado = pd.DataFrame(pool.estado())
+    estado["circuito"] = [circuitos[url].estado if url in circuitos else "cerrado" for url in estado["url"]]
+    st.dataframe(estado, use_container_width=True)
+    st.caption(
+        f"El circuito de cada réplica se abre tras {config.breaker_failures} fallos y prueba de nuevo a los "
+        f"{config.breaker_reset:.0f}s. Reintento duplicado de GET: "
+        + (f"{config.hedge_delay}s" if config.hedge_delay > 0 else "desactivado")
+    )
+
+    # Tiempos por sección de la sesión actual
+    tiempos = st.session_state.get("tiempos_secciones")
+    if tiempos:
+        st.subheader("⏱️ Tiempo por sección (esta sesión)")
+        st.dataframe(pd.DataFrame.from_dict(tiempos, orient="index"), use_container_width=True)
+
+    panel_metricas()
+
+def _tabla_histograma(nombre, escala=1000.0):
+    # Resumen de un histograma del registro; los tiempos se muestran en ms
+    import pandas as pd
+
+    df = pd.DataFrame(REGISTRO.resumen(nombre))
+    if not df.empty:
+        df[["media", "p50", "p95", "p99"]] = (df[["media", "p50", "p95", "p99"]] * escala).round(1)
+    return df
+
+@seccion
+def panel_metricas():
+    import pandas as pd
+
+    st.subheader("📈 Métricas del proceso (todas las sesiones)")
+    st.caption(
+        f"Desde {datetime.fromtimestamp(REGISTRO.inicio):%d/%m/%Y %H:%M:%S}. Percentiles estimados "
+        "a partir de histogramas de cubos fijos; tiempos en ms."
+    )
+
+    cache = REGISTRO.valores("evaluapp_cache_total")
+    # Sólo los aciertos frescos cuentan como acierto; los obsoletos (servidos mientras se
+    # revalidan) se muestran aparte y las series agrupadas como "otras" no se clasifican
+    por_resultado = {}
+    for clave, valor in cache.items():
+        resultado = dict(clave)["resultado"]
+        por_resultado[resultado] = por_resultado.get(resultado, 0) + valor
+    aciertos = por_resultado.get("acierto", 0)
+    obsoletos = por_resultado.get("obsoleto", 0)
+    consultas = sum(cache.values())
+    reruns = sum(REGISTRO.valores("evaluapp_reruns_total").values())
+    errores = sum(REGISTRO.valores("evaluapp_peticion_errores_total").values())
+    json_total = {dict(k)["resultado"]: v for k, v in REGISTRO.valores("evaluapp_json_decodificaciones_total").items()}
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Aciertos de caché", f"{aciertos / consultas:.0%}" if consultas else "—",
+                f"{consultas} consultas · {obsoletos / consultas:.0%} obsoletos" if consultas else "0 consultas",
+                delta_color="off")
+    col2.metric("Reruns", reruns)
+    col3.metric("Peticiones fallidas", errores)
+    col4.metric("JSON recuperados", json_total.get("recuperada", 0), f"{json_total.get('fallida', 0)} fallidos",
+                delta_color="off")
+
+    for titulo, nombre, escala in (
+        ("Peticiones a la API (latencia)", "evaluapp_peticion_segundos", 1000.0),
+        ("Tamaño de las respuestas (KiB)", "evaluapp_peticion_bytes", 1 / 1024),
+        ("Decodificación JSON", "evaluapp_json_decode_segundos", 1000.0),
+        ("Recuperación de JSON mal formado", "evaluapp_json_recuperacion_segundos", 1000.0),
+        ("Construcción de DataFrames e índices", "evaluapp_construccion_segundos", 1000.0),
+        ("Secciones y páginas", "evaluapp_seccion_segundos", 1000.0),
+    ):
+        df = _tabla_histograma(nombre, escala)
+        if not df.empty:
+            st.write(f"**{titulo}**")
+            st.dataframe(df, use_container_width=True, hide_index=True)
+    if cache:
+        st.write("**Caché de lecturas**")
+        st.dataframe(pd.DataFrame([{**dict(k), "consultas": v} for k, v in cache.items()]),
+                     use_container_width=True, hide_index=True)
+
+    texto = REGISTRO.texto_prometheus()
+    col_descarga, col_reiniciar = st.columns(2)
+    col_descarga.download_button("⬇️ Descargar métricas (Prometheus)", texto, file_name="metrics.txt",
+                                 mime="text/plain")
+    if col_reiniciar.button("🔄 Reiniciar métricas"):
+        REGISTRO.reiniciar()
+        st.rerun(scope="fragment")
+    if METRICAS_PUERTO > 0:
+        st.caption(f"También disponibles en http://<host>:{METRICAS_PUERTO}/metrics")
+
+# ----------------- Menú Principal -----------------
+def main():
+    st.title("📊 EvaluApp - Panel de Control")
+    role = select_role()
+    if not role:
+        st.warning("Por favor selecciona tu rol para continuar")
+        return
+
+    # Definir el menú según el rol
+    if role == "admin":
+        menu = ["Inicio", "Exámenes", "Resultados", "Usuarios", "Configuración"]
+    elif role == "student":
+        menu = ["Inicio", "Realizar Examen", "Resultados"]
+    else:
+        menu = ["Inicio", "Exámenes", "Resultados"]
+    choice = st.sidebar.selectbox("Menú", menu)
+    headers = get_headers()
+    get_servidor_metricas()
+    REGISTRO.incrementar("evaluapp_reruns_total", pagina=choice)
 
-        st.header("⚙️ Configuración del Sistema")
-        st.info("Aquí puedes agregar configuración avanzada más adelante.")
+    with en_seccion(f"pagina {choice}"), REGISTRO.medir("evaluapp_seccion_segundos", seccion=f"pagina {choice}"):
+        if choice == "Inicio":
+            st.header("Bienvenido a EvaluApp")
+        elif choice == "Exámenes":
+            pagina_examenes(headers)
+        elif choice == "Realizar Examen":
+            pagina_realizar_examen(headers)
+        elif choice == "Resultados":
+            pagina_resultados(headers)
+        elif choice == "Usuarios":
+            pagina_usuarios(headers)
+        elif choice == "Configuración":
+            pagina_configuracion()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,351 @@
+"""Pruebas de carga de los flujos de la aplicación contra la API simulada.
+
+Cada sesión simulada ejecuta `app.py` sin navegador (streamlit.testing) en
+su propio proceso y recorre los flujos elegidos contra la misma API. Al final se informa, por flujo, del número de
+ejecuciones, errores, rendimiento (flujos/s) y latencias p50/p95/p99.
+Con --arranque se mide además el arranque en frío de las páginas indicadas:
+la primera ejecución de la app en un proceso nuevo y las importaciones que
+provoca.
+
+    python benchmark.py --sesiones 8 --iteraciones 5 --latencia-ms 30 --json actual.json
+    python benchmark.py --comparar base.json --tolerancia 0.2   # sale con código 1 si hay regresiones
+    python benchmark.py --flujos "" --arranque Inicio,Resultados --repeticiones-arranque 5 --json arranque.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mock_api import ServidorMock, argumentos_config, config_desde_args
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+PALABRAS_BUSQUEDA = ("evaluacion", "algebra", "quim", "fisica", "programacion", "celula")
+
+FLUJOS = {}
+# Páginas que ve cada rol (el arranque de una página usa el primer rol que la tiene)
+MENUS = {
+    "admin": ("Inicio", "Exámenes", "Resultados", "Usuarios", "Configuración"),
+    "teacher": ("Inicio", "Exámenes", "Resultados"),
+    "student": ("Inicio", "Realizar Examen", "Resultados"),
+}
+
+
+def flujo(nombre):
+    def registrar(func):
+        FLUJOS[nombre] = func
+        return func
+    return registrar
+
+
+class ErrorFlujo(Exception):
+    pass
+
+
+def nueva_sesion(rol, pagina, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    at.session_state.role = rol
+    at.run()
+    at.sidebar.selectbox[0].select(pagina).run()
+    comprobar(at)
+    return at
+
+
+def comprobar(at):
+    # Un flujo falla si la aplicación lanzó una excepción o mostró un error
+    if at.exception:
+        raise ErrorFlujo(at.exception[0].value)
+    if at.error:
+        raise ErrorFlujo(at.error[0].value)
+
+
+# ---------------- Flujos -------------------
+@flujo("listado_examenes")
+def flujo_listado_examenes(timeout):
+    at = nueva_sesion("teacher", "Exámenes", timeout)
+    siguiente = at.button(key="tabla_examenes_siguiente")
+    if not siguiente.disabled:
+        siguiente.click().run()
+        comprobar(at)
+
+
+@flujo("crear_examen")
+def flujo_crear_examen(timeout):
+    at = nueva_sesion("teacher", "Exámenes", timeout)
+    at.text_input(key="busqueda_preguntas").input(random.choice(PALABRAS_BUSQUEDA)).run()
+    for casilla in [c for c in at.checkbox if str(c.key).startswith("sel_pregunta_")][:3]:
+        casilla.check()
+    at.run()
+    next(t for t in at.text_input if t.label == "Título del Examen").input(f"Benchmark {uuid.uuid4().hex[:8]}")
+    next(b for b in at.button if b.label == "Crear Examen").click().run()
+    comprobar(at)
+    if not any("Examen creado" in s.value for s in at.success):
+        raise ErrorFlujo("No se confirmó la creación del examen")
+
+
+@flujo("realizar_examen")
+def flujo_realizar_examen(timeout):
+    at = nueva_sesion("student", "Realizar Examen", timeout)
+    for radio in at.radio:
+        if str(radio.key).startswith("pregunta_") and radio.options:
+            radio.set_value(radio.options[0])
+    for seleccion in at.multiselect:
+        if str(seleccion.key).startswith("pregunta_") and seleccion.options:
+            seleccion.select(seleccion.options[0])
+    for texto in at.text_area:
+        if str(texto.key).startswith("pregunta_"):
+            texto.input("Respuesta de prueba")
+    at.run()
+    comprobar(at)
+    next(b for b in at.button if b.label == "Enviar examen").click().run()
+    comprobar(at)
+
+
+@flujo("resultados")
+def flujo_resultados(timeout):
+    nueva_sesion("admin", "Resultados", timeout)
+
+
+# ---------------- Ejecución -------------------
+def sesion(indice, flujos, iteraciones, timeout, calentamiento=1):
+    """Una sesión simulada: calienta cachés y repite `iteraciones` rondas de los flujos.
+
+    Devuelve {flujo: {"latencias": [...], "errores": n, "ejemplo_error": str}} y
+    la duración de la fase medida en segundos.
+    """
+    for nombre in flujos:
+        for _ in range(calentamiento):
+            try:
+                FLUJOS[nombre](timeout)
+            except Exception:
+                pass  # El calentamiento sólo llena cachés e importaciones
+
+    medidas = {nombre: {"latencias": [], "errores": 0, "ejemplo_error": None} for nombre in flujos}
+    orden = list(flujos)
+    inicio_sesion = time.perf_counter()
+    for ronda in range(iteraciones):
+        random.Random(indice * 1000 + ronda).shuffle(orden)
+        for nombre in orden:
+            medida = medidas[nombre]
+            inicio = time.perf_counter()
+            try:
+                FLUJOS[nombre](timeout)
+            except Exception as e:
+                medida["errores"] += 1
+                medida["ejemplo_error"] = medida["ejemplo_error"] or f"{type(e).__name__}: {e}"[:300]
+            else:
+                medida["latencias"].append(time.perf_counter() - inicio)
+    return medidas, time.perf_counter() - inicio_sesion
+
+
+def ejecutar(flujos, sesiones, iteraciones, timeout, calentamiento=1):
+    """Ejecuta las sesiones en paralelo y junta sus medidas.
+
+    Cada sesión corre en su propio proceso: AppTest no admite varias
+    ejecuciones simultáneas en un mismo intérprete. La duración es la de la
+    sesión más lenta, que es la que limita el rendimiento total.
+    """
+    medidas = {nombre: {"latencias": [], "errores": 0, "ejemplo_error": None} for nombre in flujos}
+    duracion = 0.0
+    with ProcessPoolExecutor(max_workers=sesiones) as executor:
+        futuros = [executor.submit(sesion, indice, flujos, iteraciones, timeout, calentamiento)
+                   for indice in range(sesiones)]
+        for futuro in futuros:
+            parciales, segundos = futuro.result()
+            duracion = max(duracion, segundos)
+            for nombre, parcial in parciales.items():
+                medida = medidas[nombre]
+                medida["latencias"].extend(parcial["latencias"])
+                medida["errores"] += parcial["errores"]
+                medida["ejemplo_error"] = medida["ejemplo_error"] or parcial["ejemplo_error"]
+    for medida in medidas.values():
+        medida["duracion"] = duracion
+    return medidas
+
+
+# Se ejecuta en un proceso nuevo con -X importtime: la marca separa en stderr las
+# importaciones de Streamlit y AppTest de las que provoca la primera ejecución de la app
+_CODIGO_ARRANQUE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app, pagina, rol, timeout = sys.argv[1], sys.argv[2], sys.argv[3], float(sys.argv[4])
+at = AppTest.from_file(app, default_timeout=timeout)
+at.session_state.role = rol
+sys.stderr.write("--- arranque ---\\n"); sys.stderr.flush()
+inicio = time.perf_counter()
+at.run()
+if pagina != "Inicio":
+    at.sidebar.selectbox[0].select(pagina).run()
+primero = time.perf_counter() - inicio
+inicio = time.perf_counter()
+at.run()
+print(json.dumps({"primero": primero, "siguiente": time.perf_counter() - inicio,
+                  "error": str(at.exception[0].value) if at.exception else None}))
+"""
+
+
+def _importaciones(stderr, limite=8) -> list:
+    # Módulos de primer nivel importados tras la marca, por tiempo acumulado (ms)
+    _, _, despues = stderr.partition("--- arranque ---")
+    modulos = []
+    for linea in despues.splitlines():
+        if not linea.startswith("import time:"):
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|", 2)
+        # Los submódulos van sangrados bajo el módulo que los importó
+        if acumulado.strip().isdigit() and not nombre.startswith("  "):
+            modulos.append((nombre.strip(), int(acumulado) / 1000))
+    return sorted(modulos, key=lambda m: -m[1])[:limite]
+
+
+def medir_arranque(paginas, repeticiones, timeout):
+    """Arranque en frío: cada repetición es un proceso nuevo que ejecuta la app una vez.
+
+    Devuelve medidas con el mismo formato que `ejecutar` (claves "arranque:<página>"),
+    con la duración de la primera ejecución como latencia, y las importaciones
+    más costosas de la última repetición de cada página.
+    """
+    medidas, importaciones = {}, {}
+    for pagina in paginas:
+        rol = next(r for r, menu in MENUS.items() if pagina in menu)
+        medida = medidas[f"arranque:{pagina}"] = {"latencias": [], "errores": 0, "ejemplo_error": None, "duracion": 0.0}
+        for _ in range(repeticiones):
+            proceso = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", _CODIGO_ARRANQUE, APP, pagina, rol, str(timeout)],
+                capture_output=True, text=True, cwd=os.path.dirname(APP),
+            )
+            try:
+                datos = json.loads(proceso.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                datos = {"error": (proceso.stderr.strip().splitlines() or ["sin salida"])[-1]}
+            if datos.get("error"):
+                medida["errores"] += 1
+                medida["ejemplo_error"] = medida["ejemplo_error"] or datos["error"][:300]
+                continue
+            medida["latencias"].append(datos["primero"])
+            importaciones[pagina] = _importaciones(proceso.stderr)
+    return medidas, importaciones
+
+
+def resumen(medidas) -> dict:
+    informe = {}
+    for nombre, medida in medidas.items():
+        latencias = np.asarray(medida["latencias"]) * 1000
+        p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) if len(latencias) else (float("nan"),) * 3
+        informe[nombre] = {
+            "ejecuciones": len(latencias),
+            "errores": medida["errores"],
+            "por_segundo": len(latencias) / medida["duracion"] if medida["duracion"] else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "ejemplo_error": medida["ejemplo_error"],
+        }
+    return informe
+
+
+def imprimir(informe):
+    print(f"{'flujo':<26}{'ok':>6}{'errores':>9}{'flujos/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for nombre, fila in informe.items():
+        print(f"{nombre:<26}{fila['ejecuciones']:>6}{fila['errores']:>9}{fila['por_segundo']:>10.2f}"
+              f"{fila['p50_ms']:>10.0f}{fila['p95_ms']:>10.0f}{fila['p99_ms']:>10.0f}")
+    for nombre, fila in informe.items():
+        if fila["ejemplo_error"]:
+            print(f"  {nombre}: {fila['ejemplo_error']}")
+
+
+def regresiones(informe, base, tolerancia) -> list:
+    # Flujos cuyo p95 sube o cuyo rendimiento baja más de `tolerancia` respecto a la base
+    avisos = []
+    for nombre, fila in informe.items():
+        anterior = base.get(nombre)
+        if not anterior:
+            continue
+        if anterior["p95_ms"] and fila["p95_ms"] > anterior["p95_ms"] * (1 + tolerancia):
+            avisos.append(f"{nombre}: p95 {anterior['p95_ms']:.0f} ms -> {fila['p95_ms']:.0f} ms")
+        if anterior["por_segundo"] and fila["por_segundo"] < anterior["por_segundo"] * (1 - tolerancia):
+            avisos.append(f"{nombre}: {anterior['por_segundo']:.2f} -> {fila['por_segundo']:.2f} flujos/s")
+    return avisos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pruebas de carga de EvaluApp contra la API simulada")
+    parser.add_argument("--flujos", default=",".join(FLUJOS), help=f"Separados por comas: {', '.join(FLUJOS)}")
+    parser.add_argument("--sesiones", type=int, default=4, help="Sesiones simuladas concurrentes (un proceso cada una)")
+    parser.add_argument("--iteraciones", type=int, default=3, help="Rondas de flujos por sesión")
+    parser.add_argument("--calentamiento", type=int, default=1, help="Rondas sin medir por sesión")
+    parser.add_argument("--timeout", type=float, default=60, help="Segundos máximos por ejecución de la app")
+    parser.add_argument("--arranque", default="",
+                        help="Páginas (separadas por comas) cuyo arranque en frío se mide en procesos nuevos")
+    parser.add_argument("--repeticiones-arranque", type=int, default=3)
+    parser.add_argument("--api-url", help="Usar una API ya levantada en lugar de la simulada")
+    parser.add_argument("--json", help="Guardar el informe en este fichero")
+    parser.add_argument("--comparar", help="Informe JSON de referencia para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.2)
+    argumentos_config(parser)
+    args = parser.parse_args(argv)
+
+    flujos = [f.strip() for f in args.flujos.split(",") if f.strip()]
+    desconocidos = [f for f in flujos if f not in FLUJOS]
+    if desconocidos:
+        parser.error(f"Flujos desconocidos: {', '.join(desconocidos)}")
+    paginas = [p.strip() for p in args.arranque.split(",") if p.strip()]
+    desconocidas = [p for p in paginas if not any(p in menu for menu in MENUS.values())]
+    if desconocidas:
+        parser.error(f"Páginas desconocidas: {', '.join(desconocidas)}")
+
+    servidor = None
+    if args.api_url:
+        url = args.api_url
+    else:
+        servidor = ServidorMock(config_desde_args(args))
+        url = servidor.iniciar()
+
+    # La app lee la configuración del entorno; el estado local va a un directorio temporal
+    directorio = tempfile.mkdtemp(prefix="evaluapp-benchmark-")
+    os.environ["API_URL"] = url
+    os.environ.pop("API_BASE_URLS", None)
+    for variable, fichero in (("ENVIOS_DB_PATH", "envios.sqlite3"), ("BORRADORES_DB_PATH", "borradores.sqlite3"),
+                              ("IMPORTACION_DB_PATH", "importaciones.sqlite3"),
+                              ("CACHE_SQLITE_PATH", "cache.sqlite3"), ("INSTANTANEAS_DIR", "instantaneas")):
+        os.environ[variable] = os.path.join(directorio, fichero)
+
+    print(f"API: {url} · {args.sesiones} sesiones × {args.iteraciones} rondas · flujos: {', '.join(flujos) or '-'}")
+    medidas, importaciones = {}, {}
+    try:
+        if paginas:
+            medidas, importaciones = medir_arranque(paginas, args.repeticiones_arranque, args.timeout)
+        if flujos:
+            medidas.update(ejecutar(flujos, args.sesiones, args.iteraciones, args.timeout, args.calentamiento))
+    finally:
+        if servidor is not None:
+            servidor.detener()
+    informe = resumen(medidas)
+    imprimir(informe)
+    for pagina, modulos in importaciones.items():
+        print(f"Importaciones de la primera ejecución ({pagina}): "
+              + ", ".join(f"{nombre} {ms:.0f} ms" for nombre, ms in modulos))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            avisos = regresiones(informe, json.load(f), args.tolerancia)
+        for aviso in avisos:
+            print(f"⚠️ Regresión: {aviso}")
+        return 1 if avisos else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
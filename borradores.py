@@ -0,0 +1,120 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class AlmacenBorradores:
+    """Borradores de respuestas por (estudiante, examen) guardados en SQLite.
+
+    `guardar` no escribe en disco: deja la última versión en memoria y un
+    temporizador la vuelca pasados `debounce` segundos, junto con el resto de
+    borradores pendientes, en una sola transacción. Así una ráfaga de clics
+    sobre las opciones cuesta una escritura. Si el volcado falla, los borradores
+    vuelven a la cola y se reintenta pasado otro `debounce`.
+    """
+
+    def __init__(self, path, debounce=2.0):
+        self.path = path
+        self.debounce = debounce
+        self._pendientes = {}  # (estudiante, examen_id) -> respuestas
+        self._en_vuelo = {}  # Borradores que está escribiendo `volcar`
+        self._temporizador = None
+        self._lock = threading.Lock()
+        # Serializa los volcados y los borrados: un volcado en curso no puede volver a
+        # escribir un borrador que `eliminar` acaba de borrar
+        self._escritura = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS borradores (
+                estudiante TEXT NOT NULL,
+                examen_id INTEGER NOT NULL,
+                respuestas TEXT NOT NULL,
+                actualizado_en REAL NOT NULL,
+                PRIMARY KEY (estudiante, examen_id)
+            )
+            """
+        )
+        atexit.register(self.volcar)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _serializar(respuestas) -> str:
+        # Lista de pares para conservar los ids de pregunta como enteros
+        return json.dumps([[pregunta_id, respuesta] for pregunta_id, respuesta in respuestas.items()])
+
+    def guardar(self, estudiante, examen_id, respuestas):
+        with self._lock:
+            self._pendientes[(estudiante, int(examen_id))] = dict(respuestas)
+            self._programar()
+
+    def _programar(self):
+        # Con self._lock adquirido
+        if self._temporizador is None:
+            self._temporizador = threading.Timer(self.debounce, self.volcar)
+            self._temporizador.daemon = True
+            self._temporizador.start()
+
+    def volcar(self):
+        with self._escritura:
+            with self._lock:
+                pendientes, self._pendientes = self._pendientes, {}
+                self._en_vuelo = pendientes
+                self._temporizador = None
+            if not pendientes:
+                return
+            ahora = time.time()
+            conn = self._conn()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO borradores (estudiante, examen_id, respuestas, actualizado_en) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(estudiante, examen_id, self._serializar(respuestas), ahora)
+                     for (estudiante, examen_id), respuestas in pendientes.items()],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # Devolver lo no guardado a la cola sin pisar versiones más nuevas y reintentar
+                with self._lock:
+                    for clave, respuestas in pendientes.items():
+                        self._pendientes.setdefault(clave, respuestas)
+                    self._programar()
+                raise
+            finally:
+                with self._lock:
+                    self._en_vuelo = {}
+
+    def cargar(self, estudiante, examen_id):
+        clave = (estudiante, int(examen_id))
+        with self._lock:
+            for borradores in (self._pendientes, self._en_vuelo):
+                if clave in borradores:
+                    return dict(borradores[clave])
+        fila = self._conn().execute(
+            "SELECT respuestas FROM borradores WHERE estudiante = ? AND examen_id = ?", clave
+        ).fetchone()
+        if fila is None:
+            return {}
+        return {pregunta_id: respuesta for pregunta_id, respuesta in json.loads(fila[0])}
+
+    def eliminar(self, estudiante, examen_id):
+        clave = (estudiante, int(examen_id))
+        with self._escritura:
+            with self._lock:
+                self._pendientes.pop(clave, None)
+            self._conn().execute("DELETE FROM borradores WHERE estudiante = ? AND examen_id = ?", clave)
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+
+from cache_backends import CacheBackend, MemoryBackend, backend_from_env, recurso_de
+from metricas import REGISTRO
+
+# TTL (segundos) por recurso; se puede sobrescribir con CACHE_TTL_<RECURSO>
+TTL_POR_RECURSO = {
+    "examenes": 30,
+    "preguntas": 120,
+    "users": 60,
+    "results": 15,
+}
+
+
+def make_key(endpoint, params=None, role=None) -> tuple:
+    params_key = tuple(sorted((params or {}).items()))
+    return (endpoint.strip("/"), params_key, role)
+
+
+class _Llamada:
+    def __init__(self):
+        self.terminada = threading.Event()
+        self.valor = None
+        self.error = None
+
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes con la misma clave: sólo una se ejecuta y el resto espera su resultado."""
+
+    def __init__(self):
+        self._llamadas = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            llamada = self._llamadas.get(key)
+            lider = llamada is None
+            if lider:
+                llamada = self._llamadas[key] = _Llamada()
+
+        if not lider:
+            llamada.terminada.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.valor
+
+        try:
+            llamada.valor = fn()
+            return llamada.valor
+        except BaseException as e:
+            llamada.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._llamadas[key]
+            llamada.terminada.set()
+
+
+class ResponseCache:
+    """Caché LRU con TTL por recurso y stale-while-revalidate.
+
+    Una entrada vencida se sigue sirviendo durante `stale_ttl` segundos mientras
+    se refresca en segundo plano; pasado ese margen se vuelve a pedir en línea.
+    Si el backend está caído (red, plazo vencido, circuito abierto o 5xx) se
+    sirve la última respuesta conocida hasta `stale_if_error` segundos después
+    de vencer. Es segura entre hilos y está pensada para compartirse entre todas las sesiones
+    del proceso: los fallos concurrentes de una misma clave se resuelven con una
+    única petición al backend.
+    """
+
+    def __init__(self, ttls=None, default_ttl=15.0, stale_ttl=300.0, stale_if_error=3600.0,
+                 backend: CacheBackend = None):
+        self.ttls = dict(TTL_POR_RECURSO if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.stale_if_error = stale_if_error
+        self.backend = backend or MemoryBackend()
+        self._refrescando = set()
+        self._vuelos = SingleFlight()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        ttls = {
+            recurso: float(os.getenv(f"CACHE_TTL_{recurso.upper()}", ttl))
+            for recurso, ttl in TTL_POR_RECURSO.items()
+        }
+        default_ttl = float(os.getenv("CACHE_TTL_DEFAULT", 15))
+        stale_ttl = float(os.getenv("CACHE_STALE_TTL", 300))
+        stale_if_error = float(os.getenv("CACHE_STALE_IF_ERROR", 3600))
+        max_age = max([default_ttl, *ttls.values()]) + max(stale_ttl, stale_if_error)
+        return cls(ttls=ttls, default_ttl=default_ttl, stale_ttl=stale_ttl,
+                   stale_if_error=stale_if_error, backend=backend_from_env(max_age))
+
+    def ttl_para(self, key) -> float:
+        return self.ttls.get(recurso_de(key[0]), self.default_ttl)
+
+    def get(self, key):
+        # Devuelve (valor, estado) con estado "fresh", "stale", "expired" (sólo útil si
+        # el backend falla) o None si no hay entrada
+        entrada = self.backend.get(key)
+        if entrada is None:
+            return None, None
+        valor, guardado_en = entrada
+        edad = time.time() - guardado_en
+        ttl = self.ttl_para(key)
+        if edad <= ttl:
+            return valor, "fresh"
+        if edad <= ttl + self.stale_ttl:
+            return valor, "stale"
+        if edad <= ttl + self.stale_if_error:
+            return valor, "expired"
+        self.backend.delete(key)
+        return None, None
+
+    def set(self, key, valor):
+        self.backend.set(key, valor, time.time())
+
+    def invalidate(self, endpoint):
+        # Elimina todas las entradas del recurso afectado por una escritura
+        recurso = recurso_de(endpoint)
+        self.backend.incrementar_generacion(recurso)
+        self.backend.delete_recurso(recurso)
+
+    def clear(self):
+        self.backend.clear()
+
+    def _generacion(self, key):
+        return self.backend.generacion(recurso_de(key[0]))
+
+    def _set_si_vigente(self, key, valor, generacion):
+        # No guardar respuestas pedidas antes de una invalidación del mismo recurso
+        if self._generacion(key) == generacion:
+            self.set(key, valor)
+
+    def get_or_fetch(self, key, fetch):
+        valor, estado = self.get(key)
+        REGISTRO.incrementar("evaluapp_cache_total", recurso=recurso_de(key[0]),
+                             resultado={"fresh": "acierto", "stale": "obsoleto"}.get(estado, "fallo"))
+        if estado == "fresh":
+            return valor
+        if estado == "stale":
+            self._refrescar_en_segundo_plano(key, fetch)
+            return valor
+        try:
+            return self._vuelos.do(key, lambda: self._fetch_y_guardar(key, fetch))
+        except Exception as e:
+            if estado == "expired" and getattr(e, "backend_caido", False):
+                return valor
+            raise
+
+    def _fetch_y_guardar(self, key, fetch):
+        # Otra llamada pudo completar la misma clave entre la consulta y la entrada al vuelo
+        valor, estado = self.get(key)
+        if estado == "fresh":
+            return valor
+        generacion = self._generacion(key)
+        valor = fetch()
+        self._set_si_vigente(key, valor, generacion)
+        return valor
+
+    def _refrescar_en_segundo_plano(self, key, fetch):
+        with self._lock:
+            if key in self._refrescando:
+                return
+            self._refrescando.add(key)
+        generacion = self._generacion(key)
+
+        def refrescar():
+            try:
+                self._set_si_vigente(key, fetch(), generacion)
+            except Exception:
+                pass  # Se conserva la entrada antigua; el próximo acceso lo reintentará
+            finally:
+                with self._lock:
+                    self._refrescando.discard(key)
+
+        threading.Thread(target=refrescar, daemon=True).start()
@@ -0,0 +1,252 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+import json_codec
+
+
+def recurso_de(endpoint: str) -> str:
+    # "examenes/5/preguntas" -> "examenes"
+    return endpoint.strip("/").split("/", 1)[0]
+
+
+# ---------------- Interfaz -------------------
+class CacheBackend(ABC):
+    """Almacenamiento de la caché de lecturas.
+
+    Las entradas son (valor, guardado_en) con `guardado_en` en segundos de
+    `time.time()`, para que varios procesos puedan compararlas. Los backends no
+    deciden la frescura: sólo guardan, expulsan por tamaño y purgan entradas
+    más antiguas que `max_age`.
+    """
+
+    @abstractmethod
+    def get(self, key) -> Optional[tuple[Any, float]]:
+        pass
+
+    @abstractmethod
+    def set(self, key, valor, guardado_en: float):
+        pass
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def delete_recurso(self, recurso: str):
+        pass
+
+    @abstractmethod
+    def generacion(self, recurso: str) -> int:
+        pass
+
+    @abstractmethod
+    def incrementar_generacion(self, recurso: str):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+
+# ---------------- Memoria del proceso -------------------
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generaciones = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entrada = self._entries.get(key)
+            if entrada is not None:
+                self._entries.move_to_end(key)
+            return entrada
+
+    def set(self, key, valor, guardado_en):
+        with self._lock:
+            self._entries[key] = (valor, guardado_en)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_recurso(self, recurso):
+        with self._lock:
+            for key in [k for k in self._entries if recurso_de(k[0]) == recurso]:
+                del self._entries[key]
+
+    def generacion(self, recurso):
+        with self._lock:
+            return self._generaciones.get(recurso, 0)
+
+    def incrementar_generacion(self, recurso):
+        with self._lock:
+            self._generaciones[recurso] = self._generaciones.get(recurso, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# ---------------- SQLite compartido entre procesos -------------------
+class SQLiteBackend(CacheBackend):
+    """Caché en un fichero SQLite compartido por todos los workers de la máquina.
+
+    Usa modo WAL (lectores concurrentes con un escritor) y `busy_timeout` para
+    esperar en lugar de fallar cuando otro proceso escribe. Cada hilo abre su
+    propia conexión. Un acierto sólo escribe `accedido_en` si el valor guardado
+    tiene más de `actualizar_acceso_cada` segundos, para que las lecturas no
+    compitan por el bloqueo de escritura: el orden LRU tiene esa resolución.
+    """
+
+    def __init__(self, path, max_entries=2048, max_bytes=256 * 1024 * 1024, max_age=3600.0,
+                 purga_cada=100, actualizar_acceso_cada=30.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.purga_cada = purga_cada  # Escrituras entre purgas de TTL y tamaño
+        self.actualizar_acceso_cada = actualizar_acceso_cada
+        self._local = threading.local()
+        self._escrituras = 0
+        self._lock = threading.Lock()
+        directorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directorio, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    clave TEXT PRIMARY KEY,
+                    recurso TEXT NOT NULL,
+                    valor BLOB NOT NULL,
+                    tamano INTEGER NOT NULL,
+                    guardado_en REAL NOT NULL,
+                    accedido_en REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_cache_recurso ON cache (recurso);
+                CREATE INDEX IF NOT EXISTS idx_cache_accedido ON cache (accedido_en);
+                CREATE TABLE IF NOT EXISTS generaciones (
+                    recurso TEXT PRIMARY KEY,
+                    generacion INTEGER NOT NULL
+                );
+                """
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _serializar_clave(key) -> str:
+        endpoint, params, role = key
+        return json.dumps([endpoint, [list(p) for p in params], role], default=str, separators=(",", ":"))
+
+    def get(self, key):
+        clave = self._serializar_clave(key)
+        fila = self._conn().execute(
+            "SELECT valor, guardado_en, accedido_en FROM cache WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila is None:
+            return None
+        valor, guardado_en, accedido_en = fila
+        ahora = time.time()
+        if ahora - guardado_en > self.max_age:
+            self.delete(key)
+            return None
+        if ahora - accedido_en > self.actualizar_acceso_cada:
+            self._conn().execute("UPDATE cache SET accedido_en = ? WHERE clave = ?", (ahora, clave))
+        return json_codec.loads(valor), guardado_en
+
+    def set(self, key, valor, guardado_en):
+        contenido = json_codec.dumps(valor)
+        if len(contenido) > self.max_bytes:
+            return  # Nunca cabría: no desplazar toda la caché por una sola entrada
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (clave, recurso, valor, tamano, guardado_en, accedido_en) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (self._serializar_clave(key), recurso_de(key[0]), contenido, len(contenido),
+             guardado_en, time.time()),
+        )
+        with self._lock:
+            self._escrituras += 1
+            purgar = self._escrituras % self.purga_cada == 0
+        if purgar:
+            self.purgar()
+
+    def purgar(self):
+        # Expulsión por TTL y después por tamaño (entradas menos usadas primero)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache WHERE guardado_en < ?", (time.time() - self.max_age,))
+            total_entradas, total_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM cache"
+            ).fetchone()
+            if total_entradas > self.max_entries or total_bytes > self.max_bytes:
+                filas = conn.execute("SELECT clave, tamano FROM cache ORDER BY accedido_en").fetchall()
+                a_borrar = []
+                for clave, tamano in filas:
+                    if total_entradas <= self.max_entries and total_bytes <= self.max_bytes:
+                        break
+                    a_borrar.append((clave,))
+                    total_entradas -= 1
+                    total_bytes -= tamano
+                conn.executemany("DELETE FROM cache WHERE clave = ?", a_borrar)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE clave = ?", (self._serializar_clave(key),))
+
+    def delete_recurso(self, recurso):
+        self._conn().execute("DELETE FROM cache WHERE recurso = ?", (recurso,))
+
+    def generacion(self, recurso):
+        fila = self._conn().execute(
+            "SELECT generacion FROM generaciones WHERE recurso = ?", (recurso,)
+        ).fetchone()
+        return fila[0] if fila else 0
+
+    def incrementar_generacion(self, recurso):
+        self._conn().execute(
+            "INSERT INTO generaciones (recurso, generacion) VALUES (?, 1) "
+            "ON CONFLICT(recurso) DO UPDATE SET generacion = generacion + 1",
+            (recurso,),
+        )
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+
+def backend_from_env(max_age: float) -> CacheBackend:
+    tipo = os.getenv("CACHE_BACKEND", "memory").lower()
+    max_entries = int(os.getenv("CACHE_MAX_ENTRIES", 256))
+    if tipo == "sqlite":
+        return SQLiteBackend(
+            os.getenv("CACHE_SQLITE_PATH", os.path.join(".cache", "evaluapp_cache.sqlite3")),
+            max_entries=max_entries,
+            max_bytes=int(os.getenv("CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+            max_age=max_age,
+            actualizar_acceso_cada=float(os.getenv("CACHE_ACTUALIZAR_ACCESO_CADA", 30)),
+        )
+    if tipo != "memory":
+        raise ValueError(f"CACHE_BACKEND desconocido: {tipo} (usa 'memory' o 'sqlite')")
+    return MemoryBackend(max_entries=max_entries)
@@ -0,0 +1,123 @@
+import bisect
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Examen:
+    id: int
+    titulo: str
+    descripcion: str
+    fecha_inicio: Optional[date]
+    fecha_fin: Optional[date]
+
+    @classmethod
+    def desde_api(cls, datos) -> "Examen":
+        return cls(
+            id=int(datos["id"]),
+            titulo=datos.get("titulo") or "",
+            descripcion=datos.get("descripcion") or "",
+            fecha_inicio=_fecha(datos.get("fechaInicio")),
+            fecha_fin=_fecha(datos.get("fechaFin")),
+        )
+
+
+def _fecha(valor) -> Optional[date]:
+    # "2025-06-01" o "2025-06-01T10:00:00"; None si falta o no es válida
+    try:
+        return date.fromisoformat(str(valor)[:10]) if valor else None
+    except ValueError:
+        return None
+
+
+class _NodoIntervalos:
+    """Árbol de intervalos centrado sobre fechas en ordinal.
+
+    Cada nodo guarda los intervalos que contienen su punto central, ordenados
+    por inicio y por fin; una consulta por fecha baja por una sola rama y sólo
+    recorre los intervalos que devuelve: O(log n + k).
+    """
+
+    __slots__ = ("centro", "por_inicio", "por_fin", "izquierda", "derecha")
+
+    def __init__(self, intervalos):
+        # intervalos: lista de (inicio, fin, examen), con inicio <= fin
+        puntos = sorted(p for inicio, fin, _ in intervalos for p in (inicio, fin))
+        self.centro = puntos[len(puntos) // 2]
+        izquierda, derecha, aqui = [], [], []
+        for intervalo in intervalos:
+            if intervalo[1] < self.centro:
+                izquierda.append(intervalo)
+            elif intervalo[0] > self.centro:
+                derecha.append(intervalo)
+            else:
+                aqui.append(intervalo)
+        self.por_inicio = sorted(aqui, key=lambda i: i[0])
+        self.por_fin = sorted(aqui, key=lambda i: i[1], reverse=True)
+        self.izquierda = _NodoIntervalos(izquierda) if izquierda else None
+        self.derecha = _NodoIntervalos(derecha) if derecha else None
+
+    def contienen(self, punto, salida):
+        nodo = self
+        while nodo is not None:
+            if punto < nodo.centro:
+                for inicio, _, examen in nodo.por_inicio:
+                    if inicio > punto:
+                        break
+                    salida.append(examen)
+                nodo = nodo.izquierda
+            elif punto > nodo.centro:
+                for _, fin, examen in nodo.por_fin:
+                    if fin < punto:
+                        break
+                    salida.append(examen)
+                nodo = nodo.derecha
+            else:
+                salida.extend(examen for _, _, examen in nodo.por_inicio)
+                return salida
+        return salida
+
+
+class CatalogoExamenes:
+    """Catálogo tipado de exámenes con las fechas ya convertidas.
+
+    `activos(dia)` usa un árbol de intervalos y `proximos(dia)` una búsqueda
+    binaria sobre las fechas de inicio ordenadas. Los exámenes sin fechas
+    válidas están en el catálogo pero nunca se consideran activos.
+    """
+
+    def __init__(self, examenes):
+        self.examenes = {}
+        for datos in examenes:
+            if isinstance(datos, dict) and datos.get("id") is not None:
+                examen = Examen.desde_api(datos)
+                self.examenes[examen.id] = examen
+        fechados = [e for e in self.examenes.values()
+                    if e.fecha_inicio and e.fecha_fin and e.fecha_inicio <= e.fecha_fin]
+        self._arbol = _NodoIntervalos(
+            [(e.fecha_inicio.toordinal(), e.fecha_fin.toordinal(), e) for e in fechados]
+        ) if fechados else None
+        self._por_inicio = sorted(fechados, key=lambda e: (e.fecha_inicio, e.id))
+        self._inicios = [e.fecha_inicio for e in self._por_inicio]
+
+    def __len__(self):
+        return len(self.examenes)
+
+    def get(self, examen_id) -> Optional[Examen]:
+        return self.examenes.get(examen_id)
+
+    def titulos(self) -> dict:
+        return {examen_id: examen.titulo for examen_id, examen in self.examenes.items()}
+
+    def activos(self, dia: date) -> list:
+        # Exámenes con fecha_inicio <= dia <= fecha_fin, por fecha de cierre
+        if self._arbol is None:
+            return []
+        activos = self._arbol.contienen(dia.toordinal(), [])
+        return sorted(activos, key=lambda e: (e.fecha_fin, e.id))
+
+    def proximos(self, dia: date, limite=5) -> list:
+        # Los siguientes exámenes en abrir después de `dia`
+        posicion = bisect.bisect_right(self._inicios, dia)
+        return self._por_inicio[posicion:posicion + limite]
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import requests
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """El circuito está abierto: no se contacta al backend hasta que pase `reset_timeout`."""
+
+
+class CircuitBreaker:
+    """Cortocircuito de tres estados para el backend.
+
+    Tras `failure_threshold` fallos consecutivos se abre y rechaza las peticiones
+    al instante durante `reset_timeout` segundos; después deja pasar una única
+    petición de prueba (semiabierto) y se cierra si tiene éxito.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, enabled=True):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.enabled = enabled
+        self._estado = CERRADO
+        self._fallos = 0
+        self._abierto_en = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._estado == ABIERTO and time.monotonic() - self._abierto_en >= self.reset_timeout:
+                return SEMIABIERTO
+            return self._estado
+
+    @property
+    def fallos(self) -> int:
+        return self._fallos
+
+    def permitir(self) -> bool:
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._estado == CERRADO:
+                return True
+            if self._estado == ABIERTO:
+                if time.monotonic() - self._abierto_en < self.reset_timeout:
+                    return False
+                self._estado = SEMIABIERTO
+                self._prueba_en_curso = False
+            # Semiabierto: sólo una petición de prueba a la vez
+            if self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def registrar_exito(self):
+        with self._lock:
+            self._estado = CERRADO
+            self._fallos = 0
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self):
+        with self._lock:
+            self._fallos += 1
+            self._prueba_en_curso = False
+            if self._estado == SEMIABIERTO or self._fallos >= self.failure_threshold:
+                self._estado = ABIERTO
+                self._abierto_en = time.monotonic()
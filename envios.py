@@ -0,0 +1,206 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PENDIENTE = "pendiente"
+ENVIANDO = "enviando"
+ENVIADO = "enviado"
+FALLIDO = "fallido"  # Rechazado por el backend (4xx) o sin más reintentos
+
+
+def nueva_clave_idempotencia() -> str:
+    return str(uuid.uuid4())
+
+
+class ColaEnvios:
+    """Cola local y persistente de envíos de exámenes.
+
+    `encolar` guarda la entrega en SQLite y vuelve al instante; un hilo en
+    segundo plano las entrega con concurrencia limitada, reintentos con espera
+    exponencial y la cabecera `Idempotency-Key`, de modo que un reintento nunca
+    cuenta dos veces el mismo examen. Varios procesos pueden compartir el mismo
+    fichero: cada fila se reclama con un UPDATE atómico antes de enviarla.
+
+    `enviar(endpoint, payload, headers)` debe devolver un objeto con `status_code`
+    y `text`; la URL se resuelve en cada intento para usar una réplica disponible.
+
+    Los envíos entregados se borran pasados `retencion` segundos (0 = nunca); los
+    fallidos se conservan para poder revisarlos.
+    """
+
+    def __init__(self, path, enviar, max_concurrencia=4, max_intentos=10, backoff_base=1.0,
+                 backoff_max=300.0, intervalo=1.0, lease=300.0, al_entregar=None, retencion=7 * 24 * 3600.0,
+                 intervalo_purga=3600.0):
+        self.path = path
+        self.enviar = enviar
+        self.max_concurrencia = max_concurrencia
+        self.max_intentos = max_intentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.intervalo = intervalo  # Segundos entre revisiones de la cola
+        self.lease = lease  # Un envío "enviando" más antiguo que esto se da por abandonado
+        self.al_entregar = al_entregar
+        self.retencion = retencion
+        self.intervalo_purga = intervalo_purga  # Segundos entre purgas de envíos entregados
+        self._ultima_purga = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._despertar = threading.Event()
+        self._en_curso = threading.Semaphore(max_concurrencia)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrencia, thread_name_prefix="envios")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS envios (
+                clave TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                intentos INTEGER NOT NULL DEFAULT 0,
+                proximo_intento REAL NOT NULL,
+                reclamado_en REAL,
+                ultimo_error TEXT,
+                creado_en REAL NOT NULL,
+                actualizado_en REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_envios_pendientes ON envios (estado, proximo_intento);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    # ---------------- API pública -------------------
+    def encolar(self, endpoint, payload, headers=None, clave=None) -> str:
+        # Encolar dos veces con la misma clave no crea un segundo envío
+        clave = clave or nueva_clave_idempotencia()
+        ahora = time.time()
+        self._conn().execute(
+            "INSERT OR IGNORE INTO envios (clave, endpoint, payload, headers, estado, proximo_intento, "
+            "creado_en, actualizado_en) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (clave, endpoint, json.dumps(payload), json.dumps(headers or {}), PENDIENTE, ahora, ahora, ahora),
+        )
+        self.iniciar()
+        self._despertar.set()
+        return clave
+
+    def estado(self, clave):
+        fila = self._conn().execute(
+            "SELECT estado, intentos, ultimo_error, proximo_intento, actualizado_en FROM envios WHERE clave = ?",
+            (clave,),
+        ).fetchone()
+        return dict(fila) if fila else None
+
+    def resumen(self) -> dict:
+        filas = self._conn().execute("SELECT estado, COUNT(*) FROM envios GROUP BY estado").fetchall()
+        return {estado: total for estado, total in filas}
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name="cola-envios", daemon=True)
+                self._hilo.start()
+
+    # ---------------- Trabajador -------------------
+    def _bucle(self):
+        while True:
+            try:
+                self._recuperar_abandonados()
+                self._despachar()
+                self._purgar()
+            except sqlite3.Error:
+                pass  # Base de datos ocupada: se reintenta en la siguiente vuelta
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+    def _recuperar_abandonados(self):
+        # Envíos reclamados por un proceso que murió a mitad de la entrega
+        self._conn().execute(
+            "UPDATE envios SET estado = ?, reclamado_en = NULL WHERE estado = ? AND reclamado_en < ?",
+            (PENDIENTE, ENVIANDO, time.time() - self.lease),
+        )
+
+    def _purgar(self):
+        ahora = time.time()
+        if not self.retencion or ahora - self._ultima_purga < self.intervalo_purga:
+            return
+        self._ultima_purga = ahora
+        self._conn().execute(
+            "DELETE FROM envios WHERE estado = ? AND actualizado_en < ?", (ENVIADO, ahora - self.retencion)
+        )
+
+    def _despachar(self):
+        ahora = time.time()
+        filas = self._conn().execute(
+            "SELECT clave FROM envios WHERE estado = ? AND proximo_intento <= ? "
+            "ORDER BY proximo_intento LIMIT ?",
+            (PENDIENTE, ahora, self.max_concurrencia * 4),
+        ).fetchall()
+        for (clave,) in filas:
+            if not self._en_curso.acquire(blocking=False):
+                return  # Concurrencia máxima alcanzada
+            reclamado = self._conn().execute(
+                "UPDATE envios SET estado = ?, reclamado_en = ? WHERE clave = ? AND estado = ?",
+                (ENVIANDO, ahora, clave, PENDIENTE),
+            ).rowcount
+            if not reclamado:
+                self._en_curso.release()  # Otro proceso se adelantó
+                continue
+            self._executor.submit(self._entregar, clave)
+
+    def _entregar(self, clave):
+        try:
+            fila = self._conn().execute(
+                "SELECT endpoint, payload, headers, intentos FROM envios WHERE clave = ?", (clave,)
+            ).fetchone()
+            headers = dict(json.loads(fila["headers"]), **{"Idempotency-Key": clave})
+            intentos = fila["intentos"] + 1
+            try:
+                response = self.enviar(fila["endpoint"], json.loads(fila["payload"]), headers)
+            except Exception as e:
+                self._reprogramar(clave, intentos, str(e))
+                return
+
+            # 409: el backend ya tenía un envío con esta clave
+            if 200 <= response.status_code < 300 or response.status_code == 409:
+                self._actualizar(clave, ENVIADO, intentos, None)
+                if self.al_entregar is not None:
+                    self.al_entregar(clave)
+            elif 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                self._actualizar(clave, FALLIDO, intentos, f"{response.status_code}: {response.text[:500]}")
+            else:
+                self._reprogramar(clave, intentos, f"{response.status_code}: {response.text[:500]}")
+        finally:
+            self._en_curso.release()
+            self._despertar.set()
+
+    def _reprogramar(self, clave, intentos, error):
+        if intentos >= self.max_intentos:
+            self._actualizar(clave, FALLIDO, intentos, error)
+            return
+        # Espera exponencial con jitter para no sincronizar a todos los clientes
+        espera = min(self.backoff_max, self.backoff_base * 2 ** (intentos - 1))
+        espera = random.uniform(espera / 2, espera)
+        self._actualizar(clave, PENDIENTE, intentos, error, proximo_intento=time.time() + espera)
+
+    def _actualizar(self, clave, estado, intentos, error, proximo_intento=None):
+        ahora = time.time()
+        self._conn().execute(
+            "UPDATE envios SET estado = ?, intentos = ?, ultimo_error = ?, reclamado_en = NULL, "
+            "proximo_intento = COALESCE(?, proximo_intento), actualizado_en = ? WHERE clave = ?",
+            (estado, intentos, error, proximo_intento, ahora, clave),
+        )
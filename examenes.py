@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+from datetime import date
+
+
+# ---------------- DTO -------------------
+@dataclass
+class ExamenRequestDTO:
+    titulo: str
+    descripcion: str
+    fechaInicio: date
+    fechaFin: date
+    creadorId: int
+    preguntasIds: list[int] # Nuevo campo para los IDs de las preguntas
+
+    def to_dict(self) -> dict:
+        return {
+            "titulo": self.titulo,
+            "descripcion": self.descripcion,
+            "fechaInicio": self.fechaInicio.isoformat(),
+            "fechaFin": self.fechaFin.isoformat(),
+            "creadorId": self.creadorId,
+            "preguntasIds": self.preguntasIds # Incluir los IDs de las preguntas
+        }
+
+
+def payload_asociacion(examen_id, preguntas_ids) -> dict:
+    # Cuerpo de POST examenes/{id}/preguntas
+    return {
+        "src": {
+            "examenId": examen_id,
+            "preguntas": [{"id": pregunta_id} for pregunta_id in preguntas_ids]
+        }
+    }
@@ -0,0 +1,209 @@
+"""Exportación de resultados, exámenes y usuarios a CSV o Parquet.
+
+Los listados se recorren página a página y cada página se escribe en el
+fichero antes de pedir la siguiente, así que la memoria usada depende del
+tamaño de página y no del total de filas.
+
+Uso desde la línea de comandos (p. ej. en una tarea programada):
+
+    python exportacion.py results --formato parquet --salida resultados.parquet
+"""
+import argparse
+import csv
+import importlib.util
+import io
+import json
+import os
+import sys
+
+from paginacion import desde_respuesta, params_pagina
+
+# Parquet es opcional (CSV funciona sin pyarrow); pyarrow sólo se importa al
+# escribir un Parquet porque su importación es lenta
+HAY_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+RECURSOS = ("results", "examenes", "users")
+FORMATOS = ("csv", "parquet")
+MIME = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+class ErrorExportacion(Exception):
+    """Los datos no se pudieron escribir en el formato pedido."""
+
+
+def formatos_disponibles() -> list:
+    return [formato for formato in FORMATOS if formato != "parquet" or HAY_PYARROW]
+
+
+def iterar_paginas(obtener, tamano=1000):
+    """Genera un listado página a página (cada elemento es una lista de filas).
+
+    `obtener(params)` devuelve la respuesta del backend para unos parámetros de
+    paginación: un `Page` de Spring o, si el backend no pagina, la lista
+    completa (que se entrega en trozos de `tamano`).
+    """
+    numero = 0
+    while True:
+        datos = obtener(params_pagina(numero, tamano))
+        if not isinstance(datos, dict):
+            datos = datos or []
+            for inicio in range(0, len(datos), tamano):
+                yield datos[inicio:inicio + tamano]
+            return
+        pagina = desde_respuesta(datos, numero, tamano)
+        if pagina.items:
+            yield pagina.items
+        if not pagina.hay_siguiente or not pagina.items:
+            return
+        numero += 1
+
+
+def _plano(valor):
+    # Listas y objetos anidados (p. ej. las respuestas de un resultado) como JSON
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+def _filas_planas(filas):
+    return [{clave: _plano(valor) for clave, valor in fila.items()} for fila in filas if isinstance(fila, dict)]
+
+
+def escribir_csv(paginas, destino) -> int:
+    """Escribe las páginas en `destino` (fichero binario) y devuelve las filas escritas.
+
+    Las columnas son las de la primera página; las que aparezcan después se ignoran.
+    """
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+    escritor = None
+    total = 0
+    try:
+        for pagina in paginas:
+            filas = _filas_planas(pagina)
+            if not filas:
+                continue
+            if escritor is None:
+                columnas = list(dict.fromkeys(clave for fila in filas for clave in fila))
+                escritor = csv.DictWriter(texto, fieldnames=columnas, extrasaction="ignore")
+                escritor.writeheader()
+            escritor.writerows(filas)
+            total += len(filas)
+        texto.flush()
+    finally:
+        texto.detach()
+    return total
+
+
+def _tipo_columna(pa, valores):
+    # Tipo de Parquet para los valores de una columna en la primera página. Los
+    # números van como float64: JSON no distingue enteros de decimales y una página
+    # posterior puede traer 7.5 donde la primera sólo traía enteros
+    tipos = {type(valor) for valor in valores if valor is not None}
+    if tipos and tipos <= {bool}:
+        return pa.bool_()
+    if tipos and tipos <= {int, float}:
+        return pa.float64()
+    return pa.string()  # Texto, columnas mixtas y columnas sin valores
+
+
+def _convertir(pa, tipo, valor):
+    # Adapta un valor de una página posterior al tipo fijado por la primera
+    if valor is None:
+        return None
+    if pa.types.is_string(tipo):
+        return valor if isinstance(valor, str) else str(valor)
+    if pa.types.is_boolean(tipo):
+        return valor if isinstance(valor, bool) else None
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    return None  # Un valor no numérico en una columna numérica se deja vacío
+
+
+def escribir_parquet(paginas, destino) -> int:
+    """Escribe cada página como un grupo de filas de Parquet y devuelve las filas escritas.
+
+    El esquema se deduce de la primera página y los valores de las páginas
+    siguientes se convierten a él; las columnas que aparezcan después se
+    ignoran, como en el CSV.
+    """
+    if not HAY_PYARROW:
+        raise RuntimeError("La exportación a Parquet necesita pyarrow (pip install pyarrow)")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    esquema = None
+    total = 0
+    try:
+        for pagina in paginas:
+            filas = _filas_planas(pagina)
+            if not filas:
+                continue
+            if esquema is None:
+                columnas = list(dict.fromkeys(clave for fila in filas for clave in fila))
+                esquema = pa.schema([(c, _tipo_columna(pa, [fila.get(c) for fila in filas])) for c in columnas])
+                escritor = pq.ParquetWriter(destino, esquema)
+            arrays = [
+                pa.array([_convertir(pa, campo.type, fila.get(campo.name)) for fila in filas], campo.type)
+                for campo in esquema
+            ]
+            escritor.write_table(pa.Table.from_arrays(arrays, schema=esquema))
+            total += len(filas)
+    except pa.ArrowException as e:
+        raise ErrorExportacion(f"No se pudo escribir el Parquet: {e}") from e
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return total
+
+
+def exportar(paginas, formato, destino) -> int:
+    if formato == "csv":
+        return escribir_csv(paginas, destino)
+    if formato == "parquet":
+        return escribir_parquet(paginas, destino)
+    raise ValueError(f"Formato no soportado: {formato}")
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    from api_client import ApiClient, ApiError
+    from api_routes import ENDPOINTS, ROLES, build_url
+
+    parser = argparse.ArgumentParser(description="Exporta datos de EvaluApp a CSV o Parquet")
+    parser.add_argument("recurso", choices=RECURSOS)
+    parser.add_argument("--formato", choices=FORMATOS, default="csv")
+    parser.add_argument("--salida", help="Fichero de destino (por defecto <recurso>.<formato>)")
+    parser.add_argument("--tamano-pagina", type=int, default=1000)
+    parser.add_argument("--rol", choices=list(ROLES), default="admin", help="Rol enviado en la cabecera X-Role")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    client = ApiClient()
+    headers = {"X-Role": ROLES[args.rol]}
+    endpoint = ENDPOINTS[args.recurso]
+    salida = args.salida or f"{args.recurso}.{args.formato}"
+
+    def obtener(params):
+        return client.fetch_json("GET", build_url(endpoint), headers=headers, params=params, condicional=False)
+
+    # Se escribe en un temporal junto al destino y sólo se renombra si la exportación
+    # termina: un fallo a mitad no deja un fichero a medias con el nombre final
+    temporal = f"{salida}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, "wb") as destino:
+            total = exportar(iterar_paginas(obtener, args.tamano_pagina), args.formato, destino)
+        os.replace(temporal, salida)
+    except (ApiError, ErrorExportacion) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    print(f"{total} filas exportadas a {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+import csv
+import hashlib
+import io
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+import json_codec
+from examenes import ExamenRequestDTO, payload_asociacion
+
+# Estados de cada fila en el punto de control
+CREADO = "creado"  # Examen creado, falta asociar sus preguntas
+COMPLETADO = "completado"
+INVALIDO = "invalido"  # La fila no pasó la validación
+ERROR = "error"  # Fallo del backend: se reintenta al reanudar
+
+FORMATOS = ("csv", "jsonl", "json")
+
+
+@dataclass
+class ResultadoFila:
+    fila: int
+    estado: str
+    titulo: str = ""
+    examen_id: Optional[int] = None
+    error: Optional[str] = None
+    reanudado: bool = False  # Resultado tomado del punto de control de una ejecución anterior
+
+    def to_dict(self) -> dict:
+        return {
+            "fila": self.fila,
+            "estado": self.estado,
+            "titulo": self.titulo,
+            "examenId": self.examen_id,
+            "error": self.error,
+            "reanudado": self.reanudado,
+        }
+
+
+# ---------------- Lectura -------------------
+def formato_de(nombre: str) -> str:
+    extension = os.path.splitext(nombre)[1].lower().lstrip(".")
+    if extension == "ndjson":
+        return "jsonl"
+    if extension not in FORMATOS:
+        raise ValueError(f"Formato no soportado: '{extension}'. Usa CSV, JSON o JSON Lines")
+    return extension
+
+
+def huella_fichero(fichero, bloque=1 << 20) -> str:
+    # Identifica la importación por su contenido para poder reanudarla
+    sha = hashlib.sha1()
+    fichero.seek(0)
+    for trozo in iter(lambda: fichero.read(bloque), b""):
+        sha.update(trozo)
+    fichero.seek(0)
+    return sha.hexdigest()
+
+
+def leer_filas(fichero, formato):
+    """Genera (número de fila, dict) sin cargar el fichero entero.
+
+    `fichero` es un fichero binario. CSV y JSON Lines se leen línea a línea; un
+    JSON normal (una lista de objetos) tiene que decodificarse de una vez.
+    """
+    fichero.seek(0)
+    if formato == "csv":
+        texto = io.TextIOWrapper(fichero, encoding="utf-8-sig", newline="")
+        try:
+            # La fila 1 es la cabecera
+            for numero, fila in enumerate(csv.DictReader(texto), start=2):
+                yield numero, fila
+        except csv.Error as e:
+            raise ValueError(f"CSV mal formado: {e}") from e
+        finally:
+            texto.detach()  # No cerrar el fichero subido al liberar el envoltorio
+    elif formato == "jsonl":
+        for numero, linea in enumerate(fichero, start=1):
+            if not linea.strip():
+                continue
+            try:
+                yield numero, json_codec.loads(linea)
+            except ValueError as e:
+                yield numero, ValueError(f"JSON inválido: {e}")
+    else:
+        datos = json_codec.loads(fichero.read())
+        if isinstance(datos, dict):
+            datos = datos.get("examenes") or datos.get("content") or []
+        if not isinstance(datos, list):
+            raise ValueError("El JSON debe ser una lista de exámenes")
+        yield from enumerate(datos, start=1)
+
+
+# ---------------- Validación -------------------
+def _fecha(valor, campo) -> date:
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(str(valor).strip()[:10])
+    except ValueError:
+        raise ValueError(f"'{campo}' no es una fecha válida (AAAA-MM-DD): {valor!r}") from None
+
+
+def _ids_preguntas(valor) -> list[int]:
+    if valor in (None, ""):
+        return []
+    if isinstance(valor, str):
+        # En CSV: "1;2;3" (también se aceptan comas o espacios)
+        valor = valor.replace(",", " ").replace(";", " ").split()
+    try:
+        return [int(pregunta_id) for pregunta_id in valor]
+    except (TypeError, ValueError):
+        raise ValueError(f"'preguntasIds' debe ser una lista de enteros: {valor!r}") from None
+
+
+def validar_fila(fila, creador_por_defecto=1, preguntas_validas=None) -> ExamenRequestDTO:
+    if isinstance(fila, Exception):
+        raise fila
+    if not isinstance(fila, dict):
+        raise ValueError("La fila no es un objeto")
+    titulo = str(fila.get("titulo") or "").strip()
+    if not titulo:
+        raise ValueError("El título es obligatorio")
+    fecha_inicio = _fecha(fila.get("fechaInicio"), "fechaInicio")
+    fecha_fin = _fecha(fila.get("fechaFin"), "fechaFin")
+    if fecha_inicio >= fecha_fin:
+        raise ValueError("La fecha de inicio debe ser anterior a la de fin")
+    creador = fila.get("creadorId")
+    try:
+        creador = int(creador) if creador not in (None, "") else creador_por_defecto
+    except (TypeError, ValueError):
+        raise ValueError(f"'creadorId' debe ser un entero: {creador!r}") from None
+    preguntas_ids = _ids_preguntas(fila.get("preguntasIds"))
+    if preguntas_validas is not None:
+        desconocidas = [i for i in preguntas_ids if i not in preguntas_validas]
+        if desconocidas:
+            raise ValueError(f"Preguntas inexistentes: {desconocidas}")
+    return ExamenRequestDTO(
+        titulo=titulo,
+        descripcion=str(fila.get("descripcion") or ""),
+        fechaInicio=fecha_inicio,
+        fechaFin=fecha_fin,
+        creadorId=creador,
+        preguntasIds=preguntas_ids,
+    )
+
+
+# ---------------- Importación -------------------
+class Importador:
+    """Importa exámenes en lotes con concurrencia limitada y se puede reanudar.
+
+    Cada fila se valida, se crea el examen (sin preguntas, como el formulario)
+    y después se asocian sus preguntas. El avance se guarda en SQLite por
+    (huella del fichero, fila): al repetir la importación del mismo fichero se
+    saltan las filas completadas o inválidas, a las que ya tienen examen sólo se
+    les asocian las preguntas y el resto se reintenta. La creación lleva la
+    cabecera `Idempotency-Key` para que un reintento no duplique el examen.
+
+    `post(endpoint, data, headers)` devuelve el JSON de la respuesta y lanza una
+    excepción si la petición falla (con `status_code` y `cuerpo` si el backend
+    respondió). Un 409 en la creación significa que un intento anterior ya creó
+    el examen: su ID se toma del cuerpo o, si no viene, de `buscar(datos, headers)`,
+    que recibe los datos enviados y devuelve el ID del examen o None.
+    """
+
+    def __init__(self, path, post, endpoint_examenes="examenes", concurrencia=4, tamano_lote=50, buscar=None):
+        self.path = path
+        self.post = post
+        self.buscar = buscar
+        self.endpoint_examenes = endpoint_examenes
+        self.concurrencia = concurrencia
+        self.tamano_lote = tamano_lote
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().execute(
+            """
+            CREATE TABLE IF NOT EXISTS importaciones (
+                importacion TEXT NOT NULL,
+                fila INTEGER NOT NULL,
+                estado TEXT NOT NULL,
+                titulo TEXT,
+                examen_id INTEGER,
+                error TEXT,
+                actualizado_en REAL NOT NULL,
+                PRIMARY KEY (importacion, fila)
+            )
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def _punto_de_control(self, importacion) -> dict:
+        filas = self._conn().execute(
+            "SELECT fila, estado, titulo, examen_id, error FROM importaciones WHERE importacion = ?",
+            (importacion,),
+        ).fetchall()
+        return {fila: ResultadoFila(fila, estado, titulo or "", examen_id, error, reanudado=True)
+                for fila, estado, titulo, examen_id, error in filas}
+
+    def _guardar(self, importacion, resultados):
+        # Un lote por transacción
+        conn = self._conn()
+        ahora = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO importaciones (importacion, fila, estado, titulo, examen_id, error, "
+                "actualizado_en) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(importacion, r.fila, r.estado, r.titulo, r.examen_id, r.error, ahora) for r in resultados],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def olvidar(self, importacion):
+        # Descarta el punto de control para volver a importar el fichero desde cero
+        self._conn().execute("DELETE FROM importaciones WHERE importacion = ?", (importacion,))
+
+    def _examen_existente(self, error, datos, headers):
+        # ID del examen que creó un intento anterior con la misma Idempotency-Key
+        try:
+            cuerpo = json_codec.loads((getattr(error, "cuerpo", None) or "").encode("utf-8"))
+        except ValueError:
+            cuerpo = None
+        if isinstance(cuerpo, dict) and cuerpo.get("id") is not None:
+            return cuerpo["id"]
+        examen_id = self.buscar(datos, headers) if self.buscar is not None else None
+        if examen_id is None:
+            raise ValueError("El examen ya se había creado (409) pero no se encontró su ID") from error
+        return examen_id
+
+    def _importar_fila(self, importacion, numero, dto: ExamenRequestDTO, previo, headers) -> ResultadoFila:
+        resultado = ResultadoFila(numero, ERROR, dto.titulo)
+        examen_id = previo.examen_id if previo is not None and previo.estado == CREADO else None
+        try:
+            if examen_id is None:
+                # No enviamos preguntas en la creación
+                datos = ExamenRequestDTO(dto.titulo, dto.descripcion, dto.fechaInicio, dto.fechaFin,
+                                         dto.creadorId, []).to_dict()
+                try:
+                    creado = self.post(self.endpoint_examenes, datos,
+                                       dict(headers or {}, **{"Idempotency-Key": f"{importacion}-{numero}"}))
+                except Exception as e:
+                    # 409: se creó en un intento cuya respuesta se perdió; se sigue con las preguntas
+                    if getattr(e, "status_code", None) != 409:
+                        raise
+                    creado = {"id": self._examen_existente(e, datos, headers)}
+                examen_id = (creado or {}).get("id")
+                if examen_id is None:
+                    raise ValueError("El backend no devolvió el ID del examen")
+            resultado.examen_id = examen_id
+            resultado.estado = CREADO
+            if dto.preguntasIds:
+                self.post(f"{self.endpoint_examenes}/{examen_id}/preguntas",
+                          payload_asociacion(examen_id, dto.preguntasIds), headers)
+            resultado.estado = COMPLETADO
+        except Exception as e:
+            resultado.error = str(e)[:500]
+        return resultado
+
+    def importar(self, fichero, formato, headers=None, creador_por_defecto=1, preguntas_validas=None,
+                 al_avanzar=None) -> list[ResultadoFila]:
+        """Importa `fichero` (binario) y devuelve el informe por fila.
+
+        `al_avanzar(resultados_del_lote)` se llama tras guardar cada lote.
+        """
+        importacion = huella_fichero(fichero)
+        previos = self._punto_de_control(importacion)
+        informe = []
+        filas = leer_filas(fichero, formato)
+        with ThreadPoolExecutor(max_workers=self.concurrencia, thread_name_prefix="importacion") as executor:
+            while True:
+                lote = list(itertools.islice(filas, self.tamano_lote))
+                if not lote:
+                    break
+                resultados, futuros = [], []
+                for numero, fila in lote:
+                    previo = previos.get(numero)
+                    if previo is not None and previo.estado in (COMPLETADO, INVALIDO):
+                        resultados.append(previo)
+                        continue
+                    try:
+                        dto = validar_fila(fila, creador_por_defecto, preguntas_validas)
+                    except ValueError as e:
+                        titulo = fila.get("titulo", "") if isinstance(fila, dict) else ""
+                        resultados.append(ResultadoFila(numero, INVALIDO, str(titulo or ""), error=str(e)))
+                        continue
+                    futuros.append(executor.submit(self._importar_fila, importacion, numero, dto, previo, headers))
+                resultados.extend(futuro.result() for futuro in futuros)
+                resultados.sort(key=lambda r: r.fila)
+                self._guardar(importacion, [r for r in resultados if not r.reanudado])
+                informe.extend(resultados)
+                if al_avanzar is not None:
+                    al_avanzar(resultados)
+        return informe
+
+
+def informe_csv(informe) -> bytes:
+    salida = io.StringIO()
+    escritor = csv.DictWriter(salida, fieldnames=list(ResultadoFila(0, "").to_dict()))
+    escritor.writeheader()
+    escritor.writerows(r.to_dict() for r in informe)
+    return salida.getvalue().encode("utf-8")
@@ -0,0 +1,95 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from dataclasses import dataclass
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalizar(texto: str) -> str:
+    # Minúsculas y sin tildes: "Evaluación" y "evaluacion" coinciden
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def tokens(texto: str) -> list[str]:
+    return _TOKEN.findall(normalizar(texto))
+
+
+@dataclass
+class ResultadoBusqueda:
+    ids: list
+    total: int
+
+
+class IndicePreguntas:
+    """Índice invertido del banco de preguntas, con claves por id de pregunta.
+
+    La búsqueda es incremental: todas las palabras de la consulta deben
+    aparecer, y la última se trata como prefijo (lo que el usuario aún está
+    escribiendo). Los prefijos se resuelven con búsqueda binaria sobre el
+    vocabulario ordenado.
+    """
+
+    def __init__(self, preguntas=()):
+        self.preguntas = {}  # id -> {"id", "texto", "tipo"}
+        self._postings = {}  # token -> set de ids
+        self._vocabulario = []  # tokens ordenados
+        self._ids_ordenados = []
+        self.agregar(preguntas)
+
+    def agregar(self, preguntas):
+        for pregunta in preguntas:
+            pregunta_id = pregunta['id']
+            texto = pregunta.get('textoPregunta') or pregunta.get('texto') or ""
+            self.preguntas[pregunta_id] = {"id": pregunta_id, "texto": texto, "tipo": pregunta.get('tipo')}
+            for token in set(tokens(texto)):
+                self._postings.setdefault(token, set()).add(pregunta_id)
+        self._vocabulario = sorted(self._postings)
+        self._ids_ordenados = sorted(self.preguntas)
+
+    def __len__(self):
+        return len(self.preguntas)
+
+    def tipos(self) -> list:
+        return sorted({p["tipo"] for p in self.preguntas.values() if p["tipo"]})
+
+    def _ids_con_prefijo(self, prefijo) -> set:
+        inicio = bisect.bisect_left(self._vocabulario, prefijo)
+        ids = set()
+        for token in self._vocabulario[inicio:]:
+            if not token.startswith(prefijo):
+                break
+            ids |= self._postings[token]
+        return ids
+
+    def buscar(self, consulta="", tipo=None, limite=20, desplazamiento=0) -> ResultadoBusqueda:
+        palabras = tokens(consulta)
+        if palabras:
+            # Intersección empezando por la lista más corta
+            conjuntos = [self._postings.get(p, set()) for p in palabras[:-1]]
+            conjuntos.append(self._ids_con_prefijo(palabras[-1]))
+            conjuntos.sort(key=len)
+            candidatos = set(conjuntos[0])
+            for conjunto in conjuntos[1:]:
+                candidatos &= conjunto
+                if not candidatos:
+                    break
+            if tipo:
+                candidatos = {i for i in candidatos if self.preguntas[i]["tipo"] == tipo}
+            # Primero las coincidencias exactas de la última palabra y los enunciados
+            # más cortos; sólo se ordena hasta la página pedida
+            exactos = self._postings.get(palabras[-1], set())
+            ordenados = heapq.nsmallest(
+                desplazamiento + limite,
+                candidatos,
+                key=lambda i: (i not in exactos, len(self.preguntas[i]["texto"]), i),
+            )
+            total = len(candidatos)
+        else:
+            ordenados = self._ids_ordenados
+            if tipo:
+                ordenados = [i for i in ordenados if self.preguntas[i]["tipo"] == tipo]
+            total = len(ordenados)
+        return ResultadoBusqueda(ids=ordenados[desplazamiento:desplazamiento + limite], total=total)
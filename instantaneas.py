@@ -0,0 +1,271 @@
+"""Copias locales (instantáneas) de los listados de exámenes y preguntas.
+
+Cada instantánea es un fichero Arrow IPC por recurso y rol, con una fila por
+registro (página de origen y registro en JSON) y, en los metadatos del
+esquema, la versión del formato, el momento en que se guardó, la generación
+del recurso y el ETag de cada página. Al abrirla se lee con memoria mapeada
+(sin copiar el fichero) y se decodifica entera una vez; después se sirve desde
+memoria. Así un proceso nuevo tiene los listados sin esperar al backend. Se
+refresca en segundo plano con peticiones condicionales: las páginas que no
+cambiaron responden 304 y se reutilizan de la copia.
+
+Una escritura en el backend cambia la generación del recurso, guardada en un
+fichero aparte del mismo directorio: las instantáneas de una generación
+anterior dejan de estar vigentes para todos los roles y todos los procesos.
+"""
+import importlib.util
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import json_codec
+from paginacion import desde_respuesta, params_pagina
+
+# Versión del formato del fichero; las copias de otro formato se ignoran (y se rehacen)
+FORMATO = 1
+EXTENSION = ".arrow"
+GENERACION = ".generacion"
+# pyarrow es opcional: sin él no hay instantáneas y todo se pide al backend
+HAY_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+@dataclass
+class Instantanea:
+    recurso: str
+    rol: Optional[str]
+    guardada_en: float  # time.time()
+    tamano_pagina: int
+    etags: list  # ETag de cada página (None si no se conoce)
+    paginas: list  # Cada página es la lista de registros que devolvió el backend
+    generacion: str = ""  # Generación del recurso cuando se descargó
+
+    def edad(self) -> float:
+        return time.time() - self.guardada_en
+
+    def __len__(self):
+        return sum(len(pagina) for pagina in self.paginas)
+
+
+def obtenedor_http(client, url, headers):
+    """Función `obtener(params, etag)` para refrescar una instantánea por HTTP.
+
+    Devuelve (304, None, etag) si la página no cambió o (200, datos, etag nuevo).
+    Los errores del backend se propagan como excepciones de requests.
+    """
+    def obtener(params, etag):
+        cabeceras = dict(headers or {})
+        if etag:
+            cabeceras["If-None-Match"] = etag
+        response = client.request("GET", url, headers=cabeceras, params=params)
+        if response.status_code == 304:
+            return 304, None, etag
+        response.raise_for_status()
+        return response.status_code, json_codec.loads(response.content) if response.content else [], \
+            response.headers.get("ETag")
+    return obtener
+
+
+class AlmacenInstantaneas:
+    """Instantáneas en disco y en memoria, compartidas por todas las sesiones.
+
+    `obtener` devuelve la última instantánea conocida del recurso y rol (si
+    otro proceso escribió una más reciente en el mismo directorio, se vuelve a
+    abrir). Una escritura en el backend la invalida (`invalidar`): sigue
+    disponible como respaldo si el backend no responde, pero `vigente` deja
+    de devolverla hasta que se guarde una nueva.
+    """
+
+    def __init__(self, directorio, refresco=60.0, tamano_pagina=500, concurrencia=2):
+        if not HAY_PYARROW:
+            raise RuntimeError("Las instantáneas necesitan pyarrow (pip install pyarrow)")
+        self.directorio = directorio
+        self.refresco = refresco
+        self.tamano_pagina = tamano_pagina
+        os.makedirs(directorio, exist_ok=True)
+        self._memoria = {}  # (recurso, rol) -> (Instantanea, mtime del fichero)
+        self._refrescando = set()
+        self._errores = {}  # (recurso, rol) -> (momento, mensaje) del último refresco fallido
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix="instantaneas")
+
+    def _ruta(self, recurso, rol) -> str:
+        return os.path.join(self.directorio, f"{recurso}-{(rol or 'anonimo').lower()}{EXTENSION}")
+
+    def _ruta_generacion(self, recurso) -> str:
+        return os.path.join(self.directorio, f"{recurso}{GENERACION}")
+
+    def generacion(self, recurso) -> str:
+        # Cambia con cada invalidación; "" si el recurso nunca se ha invalidado
+        try:
+            with open(self._ruta_generacion(recurso), encoding="utf-8") as fichero:
+                return fichero.read().strip()
+        except FileNotFoundError:
+            return ""
+
+    # ---------------- Lectura -------------------
+    def obtener(self, recurso, rol) -> Optional[Instantanea]:
+        ruta = self._ruta(recurso, rol)
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except FileNotFoundError:
+            with self._lock:
+                actual = self._memoria.get((recurso, rol))
+            return actual[0] if actual else None
+        with self._lock:
+            actual = self._memoria.get((recurso, rol))
+        if actual is not None and actual[1] == mtime:
+            return actual[0]
+        instantanea = self._leer(ruta, recurso, rol)
+        if instantanea is not None:
+            with self._lock:
+                self._memoria[(recurso, rol)] = (instantanea, mtime)
+            return instantanea
+        return actual[0] if actual else None
+
+    def vigente(self, recurso, rol) -> Optional[Instantanea]:
+        instantanea = self.obtener(recurso, rol)
+        if instantanea is None or instantanea.generacion != self.generacion(recurso):
+            return None
+        return instantanea
+
+    def _leer(self, ruta, recurso, rol) -> Optional[Instantanea]:
+        import pyarrow as pa
+
+        try:
+            with pa.memory_map(ruta) as fuente:
+                tabla = pa.ipc.open_file(fuente).read_all()
+                metadatos = {k.decode(): v.decode() for k, v in (tabla.schema.metadata or {}).items()}
+                if int(metadatos.get("formato", 0)) != FORMATO:
+                    return None
+                etags = json.loads(metadatos["etags"])
+                paginas = [[] for _ in etags]
+                numeros = tabla.column("pagina").to_numpy()
+                datos = tabla.column("datos").to_pylist()
+        except (OSError, ValueError, KeyError, pa.ArrowException):
+            return None  # Fichero incompleto, corrupto o de otra versión: se rehará
+        # Una sola decodificación JSON por página en lugar de una por registro
+        inicio = 0
+        for fin in range(1, len(numeros) + 1):
+            if fin == len(numeros) or numeros[fin] != numeros[inicio]:
+                paginas[numeros[inicio]] = json_codec.loads(b"[" + b",".join(datos[inicio:fin]) + b"]")
+                inicio = fin
+        return Instantanea(recurso=recurso, rol=rol, guardada_en=float(metadatos["guardada_en"]),
+                           tamano_pagina=int(metadatos["tamano_pagina"]), etags=etags, paginas=paginas,
+                           generacion=metadatos.get("generacion", ""))
+
+    def error(self, recurso, rol) -> Optional[tuple]:
+        with self._lock:
+            return self._errores.get((recurso, rol))
+
+    def registrar_error(self, recurso, rol, mensaje):
+        # Se borra al guardar una instantánea nueva
+        with self._lock:
+            self._errores[(recurso, rol)] = (time.time(), mensaje)
+
+    # ---------------- Escritura -------------------
+    def guardar(self, recurso, rol, paginas, tamano_pagina, etags=None, generacion=None) -> Instantanea:
+        # `generacion`: la del recurso cuando se empezaron a pedir las páginas (por
+        # defecto la actual); si hubo una invalidación después, no será vigente
+        import pyarrow as pa
+
+        if generacion is None:
+            generacion = self.generacion(recurso)
+        instantanea = Instantanea(recurso=recurso, rol=rol, guardada_en=time.time(), tamano_pagina=tamano_pagina,
+                                  etags=list(etags or [None] * len(paginas)), paginas=paginas,
+                                  generacion=generacion)
+        numeros = [numero for numero, pagina in enumerate(paginas) for _ in pagina]
+        datos = [json_codec.dumps(registro) for pagina in paginas for registro in pagina]
+        esquema = pa.schema(
+            [("pagina", pa.int32()), ("datos", pa.binary())],
+            metadata={"formato": str(FORMATO), "recurso": recurso, "rol": rol or "",
+                      "guardada_en": repr(instantanea.guardada_en), "tamano_pagina": str(tamano_pagina),
+                      "etags": json.dumps(instantanea.etags), "generacion": generacion},
+        )
+        tabla = pa.table([pa.array(numeros, pa.int32()), pa.array(datos, pa.binary())], schema=esquema)
+        # Sin compresión para poder leerla con memoria mapeada; se escribe aparte y se
+        # sustituye de forma atómica para que ningún lector vea un fichero a medias
+        ruta = self._ruta(recurso, rol)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(temporal, "wb") as destino, pa.ipc.new_file(destino, esquema) as escritor:
+            escritor.write_table(tabla)
+        os.replace(temporal, ruta)
+        with self._lock:
+            self._memoria[(recurso, rol)] = (instantanea, os.stat(ruta).st_mtime_ns)
+            self._errores.pop((recurso, rol), None)
+        return instantanea
+
+    def guardar_en_segundo_plano(self, recurso, rol, paginas, tamano_pagina):
+        generacion = self.generacion(recurso)
+        self._executor.submit(self._guardar_sin_errores, recurso, rol, paginas, tamano_pagina, None, generacion)
+
+    def _guardar_sin_errores(self, *args):
+        try:
+            self.guardar(*args)
+        except OSError:
+            pass  # Disco lleno o sin permisos: se seguirá pidiendo al backend
+
+    def invalidar(self, recurso):
+        # Tras una escritura en el backend: una generación nueva en disco invalida las
+        # copias de todos los roles, también las de otros procesos
+        ruta = self._ruta_generacion(recurso)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as fichero:
+                fichero.write(uuid.uuid4().hex)
+            os.replace(temporal, ruta)
+        except OSError:
+            pass  # Sin permisos: las copias se seguirán sirviendo hasta su próximo refresco
+
+    # ---------------- Refresco incremental -------------------
+    def refrescar(self, recurso, rol, obtener) -> Instantanea:
+        """Descarga de nuevo el listado pidiendo cada página con su ETag.
+
+        Las páginas que responden 304 se toman de la instantánea anterior. Si
+        la primera página no cambió tampoco cambió el total, así que el número
+        de páginas es el de la instantánea anterior.
+        """
+        generacion = self.generacion(recurso)
+        anterior = self.obtener(recurso, rol)
+        tamano = anterior.tamano_pagina if anterior else self.tamano_pagina
+        etags_previos = anterior.etags if anterior else []
+
+        def pagina(numero):
+            etag = etags_previos[numero] if numero < len(etags_previos) else None
+            codigo, datos, etag_nuevo = obtener(params_pagina(numero, tamano), etag)
+            if codigo == 304:
+                return anterior.paginas[numero], etag, None
+            if not isinstance(datos, dict):
+                return list(datos or []), etag_nuevo, 1  # El backend no pagina: lista completa
+            leida = desde_respuesta(datos, numero, tamano)
+            return leida.items, etag_nuevo, leida.total_paginas
+
+        items, etag, total_paginas = pagina(0)
+        if total_paginas is None:
+            total_paginas = len(anterior.paginas)
+        resto = list(self._executor.map(pagina, range(1, total_paginas))) if total_paginas > 1 else []
+        paginas = [items] + [p[0] for p in resto]
+        etags = [etag] + [p[1] for p in resto]
+        return self.guardar(recurso, rol, paginas, tamano, etags, generacion)
+
+    def refrescar_en_segundo_plano(self, recurso, rol, obtener):
+        with self._lock:
+            if (recurso, rol) in self._refrescando:
+                return
+            self._refrescando.add((recurso, rol))
+
+        def tarea():
+            try:
+                self.refrescar(recurso, rol, obtener)
+            except Exception as e:
+                # Se sigue sirviendo la copia anterior; el aviso de la interfaz lo indica
+                self.registrar_error(recurso, rol, str(e)[:300])
+            finally:
+                with self._lock:
+                    self._refrescando.discard((recurso, rol))
+
+        threading.Thread(target=tarea, daemon=True, name=f"refresco-{recurso}").start()
@@ -0,0 +1,80 @@
+import json
+import os
+import time
+
+from metricas import REGISTRO
+
+# Backend de decodificación: orjson > ujson > json (biblioteca estándar).
+# JSON_BACKEND permite forzar uno concreto, p. ej. para comparar rendimiento.
+_preferido = os.getenv("JSON_BACKEND", "").lower()
+
+
+def _cargar_dumps():
+    # Serialización a bytes (usada por las cachés persistentes)
+    try:
+        import orjson
+        return orjson.dumps
+    except ImportError:
+        return lambda valor: json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _cargar_backend():
+    candidatos = [_preferido] if _preferido else ["orjson", "ujson"]
+    for nombre in candidatos:
+        if nombre == "orjson":
+            try:
+                import orjson
+                return "orjson", orjson.loads
+            except ImportError:
+                continue
+        if nombre == "ujson":
+            try:
+                import ujson
+                return "ujson", ujson.loads
+            except ImportError:
+                continue
+    # json.loads acepta bytes directamente y detecta UTF-8/16/32
+    return "json", json.loads
+
+
+BACKEND, _loads = _cargar_backend()
+dumps = _cargar_dumps()
+
+# La recuperación sólo se intenta en cuerpos de hasta este tamaño
+MAX_BYTES_RECUPERACION = int(os.getenv("JSON_MAX_BYTES_RECUPERACION", 5 * 1024 * 1024))
+_BOM_UTF8 = b"\xef\xbb\xbf"
+
+# Los resultados se publican en metricas.REGISTRO (panel de Configuración y /metrics)
+_DECODIFICACIONES = "evaluapp_json_decodificaciones_total"
+
+
+def loads(contenido: bytes):
+    """Decodifica JSON en una sola pasada directamente desde los bytes de la respuesta.
+
+    Si falla, hace un único intento de recuperación (BOM y espacios/NUL en los
+    extremos) y sólo si el cuerpo no supera MAX_BYTES_RECUPERACION; si tampoco
+    funciona se propaga el error original.
+    """
+    try:
+        valor = _loads(contenido)
+    except ValueError as error_original:
+        inicio = time.perf_counter()
+        limpio = contenido
+        if len(contenido) <= MAX_BYTES_RECUPERACION:
+            if limpio.startswith(_BOM_UTF8):
+                limpio = limpio[len(_BOM_UTF8):]
+            limpio = limpio.strip(b" \t\r\n\x00")
+        if limpio == contenido:
+            REGISTRO.incrementar(_DECODIFICACIONES, resultado="fallida")
+            raise
+        try:
+            valor = _loads(limpio)
+        except ValueError:
+            REGISTRO.incrementar(_DECODIFICACIONES, resultado="fallida")
+            raise error_original from None
+        finally:
+            REGISTRO.observar("evaluapp_json_recuperacion_segundos", time.perf_counter() - inicio)
+        REGISTRO.incrementar(_DECODIFICACIONES, resultado="recuperada")
+        return valor
+    REGISTRO.incrementar(_DECODIFICACIONES, resultado="directa")
+    return valor
@@ -0,0 +1,113 @@
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+ROUND_ROBIN = "round_robin"
+LEAST_OUTSTANDING = "least_outstanding"
+
+
+@dataclass
+class Backend:
+    base_url: str
+    en_curso: int = 0  # Peticiones sin terminar
+    fallos_seguidos: int = 0
+    expulsado_hasta: float = 0.0
+    total: int = 0
+    errores: int = 0
+
+    def disponible(self, ahora) -> bool:
+        return ahora >= self.expulsado_hasta
+
+
+class BackendPool:
+    """Reparte las peticiones entre varias réplicas del backend.
+
+    Estrategias: `round_robin` o `least_outstanding` (menos peticiones en curso).
+    Una réplica con `eject_failures` fallos seguidos se expulsa durante
+    `eject_seconds`; si todas están expulsadas se usan todas igualmente.
+
+    Las URLs se construyen sobre la primera réplica (`url_de`) y el cliente
+    HTTP elige la réplica real en cada intento (`ruta_de` + `elegir`).
+    """
+
+    def __init__(self, base_urls, strategy=ROUND_ROBIN, eject_failures=3, eject_seconds=30.0):
+        if not base_urls:
+            raise ValueError("Se necesita al menos una URL base del backend")
+        if strategy not in (ROUND_ROBIN, LEAST_OUTSTANDING):
+            raise ValueError(f"Estrategia de balanceo desconocida: {strategy}")
+        self.backends = [Backend(url.rstrip("/")) for url in base_urls]
+        self.strategy = strategy
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self._turno = itertools.count()
+        self._lock = threading.Lock()
+
+    def elegir(self, excluir=()) -> Optional[str]:
+        # `excluir`: réplicas ya probadas o con el circuito abierto; None si no queda ninguna
+        with self._lock:
+            ahora = time.monotonic()
+            restantes = [b for b in self.backends if b.base_url not in excluir]
+            if not restantes:
+                return None
+            candidatos = [b for b in restantes if b.disponible(ahora)] or restantes
+            desplazamiento = next(self._turno)
+            if self.strategy == LEAST_OUTSTANDING:
+                # Empates resueltos por turno para no cargar siempre la primera réplica
+                n = len(candidatos)
+                rotados = [candidatos[(desplazamiento + i) % n] for i in range(n)]
+                elegido = min(rotados, key=lambda b: b.en_curso)
+            else:
+                elegido = candidatos[desplazamiento % len(candidatos)]
+            return elegido.base_url
+
+    def url_de(self, ruta) -> str:
+        return f"{self.backends[0].base_url}/{ruta}"
+
+    def ruta_de(self, url) -> Optional[str]:
+        # Ruta relativa a la réplica (None si la URL no es de ninguna réplica del pool)
+        backend = self.backend_de(url)
+        return None if backend is None else url[len(backend.base_url):].lstrip("/")
+
+    def backend_de(self, url):
+        for backend in self.backends:
+            if url.startswith(backend.base_url + "/") or url == backend.base_url:
+                return backend
+        return None
+
+    def inicio(self, url):
+        backend = self.backend_de(url)
+        if backend is not None:
+            with self._lock:
+                backend.en_curso += 1
+                backend.total += 1
+
+    def fin(self, url, ok):
+        backend = self.backend_de(url)
+        if backend is None:
+            return
+        with self._lock:
+            backend.en_curso -= 1
+            if ok:
+                backend.fallos_seguidos = 0
+                return
+            backend.errores += 1
+            backend.fallos_seguidos += 1
+            if backend.fallos_seguidos >= self.eject_failures:
+                backend.expulsado_hasta = time.monotonic() + self.eject_seconds
+                backend.fallos_seguidos = 0
+
+    def estado(self) -> list[dict]:
+        ahora = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": b.base_url,
+                    "disponible": b.disponible(ahora),
+                    "en_curso": b.en_curso,
+                    "peticiones": b.total,
+                    "errores": b.errores,
+                }
+                for b in self.backends
+            ]
@@ -0,0 +1,211 @@
+"""Métricas del proceso: latencias, tamaños y contadores del camino crítico.
+
+Los histogramas tienen cubos fijos (memoria constante por serie) y el número
+de series por métrica está acotado, así que el registro no crece con el
+tiempo de ejecución. `texto_prometheus()` devuelve el formato de exposición
+de texto de Prometheus.
+"""
+import bisect
+import contextvars
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Cubos (límite superior) para segundos y para bytes
+CUBOS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CUBOS_BYTES = tuple(256 * 4 ** i for i in range(10))  # 256 B .. 64 MiB
+
+MAX_SERIES = int(os.getenv("METRICAS_MAX_SERIES", 200))
+OTRAS = "otras"  # Etiqueta de las series que superan MAX_SERIES
+
+# Sección de la interfaz que está ejecutándose; etiqueta las peticiones que hace
+SECCION = contextvars.ContextVar("seccion", default="-")
+
+_SEGMENTO_ID = re.compile(r"^(\d+|[0-9a-fA-F-]{32,36})$")
+
+
+def etiqueta_endpoint(url) -> str:
+    # Ruta de la URL con los identificadores sustituidos, p. ej. /api/examenes/{id}/preguntas
+    ruta = urlparse(url).path or "/"
+    return "/".join("{id}" if _SEGMENTO_ID.match(s) else s for s in ruta.split("/"))
+
+
+@contextmanager
+def en_seccion(nombre):
+    token = SECCION.set(nombre)
+    try:
+        yield
+    finally:
+        SECCION.reset(token)
+
+
+class Histograma:
+    __slots__ = ("cubos", "conteos", "total", "suma")
+
+    def __init__(self, cubos):
+        self.cubos = cubos
+        self.conteos = [0] * (len(cubos) + 1)  # El último es +Inf
+        self.total = 0
+        self.suma = 0.0
+
+    def observar(self, valor):
+        self.conteos[bisect.bisect_left(self.cubos, valor)] += 1
+        self.total += 1
+        self.suma += valor
+
+    def cuantil(self, q) -> float:
+        # Estimación por interpolación lineal dentro del cubo, como histogram_quantile
+        if not self.total:
+            return math.nan
+        objetivo = q * self.total
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            if acumulado + conteo >= objetivo and conteo:
+                if i == len(self.cubos):
+                    return self.cubos[-1]
+                inferior = self.cubos[i - 1] if i else 0.0
+                return inferior + (self.cubos[i] - inferior) * (objetivo - acumulado) / conteo
+            acumulado += conteo
+        return self.cubos[-1]
+
+
+class Registro:
+    """Histogramas y contadores etiquetados, seguros entre hilos."""
+
+    def __init__(self, max_series=MAX_SERIES):
+        self.max_series = max_series
+        self._histogramas = {}  # nombre -> (cubos, ayuda, {etiquetas: Histograma})
+        self._contadores = {}  # nombre -> (ayuda, {etiquetas: valor})
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+
+    def _serie(self, series, etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        if clave not in series and len(series) >= self.max_series:
+            clave = tuple((k, OTRAS) for k, _ in clave)
+        return clave
+
+    def histograma(self, nombre, ayuda, cubos=CUBOS_SEGUNDOS):
+        with self._lock:
+            self._histogramas.setdefault(nombre, (cubos, ayuda, {}))
+
+    def contador(self, nombre, ayuda):
+        with self._lock:
+            self._contadores.setdefault(nombre, (ayuda, {}))
+
+    def observar(self, nombre, valor, /, **etiquetas):
+        with self._lock:
+            cubos, _, series = self._histogramas[nombre]
+            clave = self._serie(series, etiquetas)
+            histograma = series.get(clave)
+            if histograma is None:
+                histograma = series[clave] = Histograma(cubos)
+            histograma.observar(valor)
+
+    def incrementar(self, nombre, cantidad=1, /, **etiquetas):
+        with self._lock:
+            _, series = self._contadores[nombre]
+            clave = self._serie(series, etiquetas)
+            series[clave] = series.get(clave, 0) + cantidad
+
+    @contextmanager
+    def medir(self, nombre, /, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio, **etiquetas)
+
+    def resumen(self, nombre) -> list:
+        # Una fila por serie del histograma: etiquetas, n, media, p50, p95 y p99
+        with self._lock:
+            _, _, series = self._histogramas[nombre]
+            filas = []
+            for clave, h in series.items():
+                fila = dict(clave)
+                fila.update(n=h.total, media=h.suma / h.total if h.total else math.nan,
+                            p50=h.cuantil(0.5), p95=h.cuantil(0.95), p99=h.cuantil(0.99))
+                filas.append(fila)
+        return sorted(filas, key=lambda f: -f["n"])
+
+    def valores(self, nombre) -> dict:
+        with self._lock:
+            return dict(self._contadores[nombre][1])
+
+    def reiniciar(self):
+        with self._lock:
+            for _, _, series in self._histogramas.values():
+                series.clear()
+            for _, series in self._contadores.values():
+                series.clear()
+            self.inicio = time.time()
+
+    def texto_prometheus(self) -> str:
+        lineas = []
+        with self._lock:
+            for nombre, (ayuda, series) in sorted(self._contadores.items()):
+                lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter"]
+                for clave, valor in series.items():
+                    lineas.append(f"{nombre}{_etiquetas(clave)} {valor}")
+            for nombre, (cubos, ayuda, series) in sorted(self._histogramas.items()):
+                lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} histogram"]
+                for clave, h in series.items():
+                    acumulado = 0
+                    for limite, conteo in zip(list(cubos) + ["+Inf"], h.conteos):
+                        acumulado += conteo
+                        lineas.append(f"{nombre}_bucket{_etiquetas(clave, le=limite)} {acumulado}")
+                    lineas.append(f"{nombre}_sum{_etiquetas(clave)} {h.suma:.6f}")
+                    lineas.append(f"{nombre}_count{_etiquetas(clave)} {h.total}")
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(clave, **extra) -> str:
+    pares = list(clave) + list(extra.items())
+    if not pares:
+        return ""
+    escapar = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in pares) + "}"
+
+
+# Registro único del proceso (compartido por todas las sesiones de Streamlit)
+REGISTRO = Registro()
+REGISTRO.histograma("evaluapp_peticion_segundos", "Latencia de las peticiones a la API")
+REGISTRO.histograma("evaluapp_peticion_bytes", "Tamaño del cuerpo de las respuestas de la API", CUBOS_BYTES)
+REGISTRO.contador("evaluapp_peticion_errores_total", "Peticiones a la API fallidas")
+REGISTRO.histograma("evaluapp_json_decode_segundos", "Tiempo de decodificación JSON de las respuestas")
+REGISTRO.contador("evaluapp_json_decodificaciones_total",
+                  "Decodificaciones JSON por resultado (directa, recuperada tras limpiar BOM/espacios o fallida)")
+REGISTRO.histograma("evaluapp_json_recuperacion_segundos", "Tiempo de los intentos de recuperación de JSON")
+REGISTRO.histograma("evaluapp_construccion_segundos", "Tiempo de construcción de DataFrames e índices")
+REGISTRO.contador("evaluapp_cache_total", "Consultas a la caché de lecturas por resultado")
+REGISTRO.contador("evaluapp_reruns_total", "Ejecuciones completas del script por página")
+REGISTRO.histograma("evaluapp_seccion_segundos", "Tiempo de ejecución de cada sección de la interfaz")
+
+
+class _HandlerMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = REGISTRO.texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def servir_metricas(puerto, host="0.0.0.0") -> ThreadingHTTPServer:
+    # Expone /metrics en un hilo en segundo plano para que Prometheus lo recoja
+    servidor = ThreadingHTTPServer((host, puerto), _HandlerMetricas)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True, name="metricas").start()
+    return servidor
@@ -0,0 +1,303 @@
+"""Servidor local que imita la API de EvaluApp para pruebas de rendimiento.
+
+Sirve los endpoints de `api_routes.ENDPOINTS` (examenes, preguntas, results,
+users) con datos sintéticos del tamaño que se indique, y permite añadir
+latencia y errores. Entiende `page`/`size`/`sort`/`fields` (respuesta `Page`
+de Spring), `ETag`/`If-None-Match` y la cabecera `Idempotency-Key`.
+
+    python mock_api.py --puerto 8765 --examenes 500 --preguntas 20000 --latencia-ms 40 --tasa-errores 0.01
+    API_URL=http://127.0.0.1:8765/api streamlit run app.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TIPOS = ("SELECCION_UNICA", "MULTIPLE", "TEXTO_ABIERTO")
+PALABRAS = ("evaluación", "álgebra", "historia", "química", "física", "programación", "biología",
+            "geografía", "derivada", "integral", "célula", "átomo", "revolución", "función", "variable")
+
+
+@dataclass
+class ConfigMock:
+    examenes: int = 200
+    preguntas: int = 5000
+    preguntas_por_examen: int = 20
+    usuarios: int = 1000
+    resultados: int = 20000
+    latencia_ms: float = 0.0
+    jitter_ms: float = 0.0
+    tasa_errores: float = 0.0  # Probabilidad de responder 503
+    paginar: bool = True  # False: ignora page/size y devuelve la lista completa
+    semilla: int = 42
+
+
+class DatosMock:
+    """Conjunto de datos sintético y coherente entre endpoints."""
+
+    def __init__(self, config: ConfigMock):
+        rnd = random.Random(config.semilla)
+        hoy = date.today()
+        self.lock = threading.Lock()
+        self.preguntas = []
+        for i in range(1, config.preguntas + 1):
+            tipo = TIPOS[i % len(TIPOS)]
+            texto = " ".join(rnd.choice(PALABRAS) for _ in range(6)) + f" ({i})"
+            opciones = [] if tipo == "TEXTO_ABIERTO" else [
+                {"id": i * 10 + j, "texto": f"Opción {j + 1}", "esCorrecta": j == 0} for j in range(4)
+            ]
+            self.preguntas.append({"id": i, "textoPregunta": texto, "texto": texto, "tipo": tipo, "opciones": opciones})
+        self.examenes = []
+        self.preguntas_de = {}
+        for i in range(1, config.examenes + 1):
+            inicio = hoy + timedelta(days=rnd.randint(-30, 30))
+            ids = rnd.sample(range(1, config.preguntas + 1), min(config.preguntas_por_examen, config.preguntas))
+            self.examenes.append({
+                "id": i, "titulo": f"Examen {i}", "descripcion": f"Examen sintético {i}",
+                "fechaInicio": inicio.isoformat(), "fechaFin": (inicio + timedelta(days=rnd.randint(1, 45))).isoformat(),
+                "creadorId": 1, "creadorNombre": "Docente", "preguntasIds": ids,
+            })
+            self.preguntas_de[i] = ids
+        self.usuarios = [
+            {"id": i, "nombre": f"Usuario {i}", "email": f"usuario{i}@evaluapp.test",
+             "rol": ("STUDENT", "TEACHER", "ADMIN")[0 if i % 20 else 1]}
+            for i in range(1, config.usuarios + 1)
+        ]
+        self.resultados = []
+        for i in range(1, config.resultados + 1):
+            examen = rnd.randint(1, max(config.examenes, 1))
+            habilidad = rnd.random()
+            respuestas = [{"preguntaId": p, "correcta": rnd.random() < 0.3 + 0.6 * habilidad}
+                          for p in self.preguntas_de.get(examen, [])]
+            self.resultados.append({
+                "id": i, "examenId": examen, "usuarioId": rnd.randint(1, max(config.usuarios, 1)),
+                "puntaje": round(10 * sum(r["correcta"] for r in respuestas) / max(len(respuestas), 1), 2),
+                "fecha": (hoy - timedelta(days=rnd.randint(0, 180))).isoformat(),
+                "completado": True, "respuestas": respuestas,
+            })
+        self.claves_idempotencia = set()
+        self.version = 0  # Cambia con cada escritura: invalida los cuerpos serializados
+
+    def listado(self, recurso):
+        if recurso == "examenes":
+            return self.examenes
+        if recurso == "preguntas":
+            return self.preguntas
+        if recurso == "users":
+            return self.usuarios
+        if recurso == "results":
+            return self.resultados
+        return None
+
+
+def _pagina(items, consulta, paginar):
+    # Aplica sort/fields y, si se pide, page/size con la forma de un Page de Spring.
+    # Lanza ValueError si page o size no son enteros válidos
+    if "sort" in consulta:
+        campo, _, direccion = consulta["sort"][0].partition(",")
+
+        def clave(item):
+            # Los nulos al final (al principio con desc); el "" evita comparar None con None
+            valor = item.get(campo)
+            return valor is None, valor if valor is not None else ""
+
+        items = sorted(items, key=clave, reverse=direccion == "desc")
+    if "fields" in consulta:
+        campos = consulta["fields"][0].split(",")
+        items = [{campo: item.get(campo) for campo in campos} for item in items]
+    if not paginar or "page" not in consulta:
+        return items
+    numero, tamano = int(consulta["page"][0]), int(consulta.get("size", ["20"])[0])
+    if numero < 0 or tamano < 1:
+        raise ValueError(f"Página o tamaño no válidos: page={numero}, size={tamano}")
+    return {"content": items[numero * tamano:(numero + 1) * tamano], "totalElements": len(items),
+            "number": numero, "size": tamano}
+
+
+def crear_handler(datos: DatosMock, config: ConfigMock):
+    cuerpos = {}  # (version, ruta) -> (bytes, etag)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como el backend real
+
+        def log_message(self, *args):
+            pass
+
+        def _simular_red(self) -> bool:
+            # Latencia y errores inyectados; devuelve False si se respondió con error
+            if config.latencia_ms or config.jitter_ms:
+                time.sleep(max(0.0, config.latencia_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000)
+            if config.tasa_errores and random.random() < config.tasa_errores:
+                self._responder(503, {"error": "Error simulado"})
+                return False
+            return True
+
+        def _responder(self, codigo, objeto=None, cuerpo=None, etag=None):
+            if cuerpo is None:
+                cuerpo = b"" if objeto is None else json.dumps(objeto).encode()
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            if etag:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def _leer_json(self):
+            longitud = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(longitud) or b"null")
+
+        def _ruta(self):
+            url = urlparse(self.path)
+            return re.sub(r"^/api/?", "", url.path).strip("/"), parse_qs(url.query)
+
+        def do_GET(self):
+            if not self._simular_red():
+                return
+            ruta, consulta = self._ruta()
+            clave = (datos.version, self.path)
+            guardado = cuerpos.get(clave)
+            if guardado is None:
+                partes = ruta.split("/")
+                try:
+                    if len(partes) == 1 and datos.listado(partes[0]) is not None:
+                        objeto = _pagina(datos.listado(partes[0]), consulta, config.paginar)
+                    elif len(partes) == 3 and partes[0] == "examenes" and partes[2] == "preguntas":
+                        ids = datos.preguntas_de.get(int(partes[1]))
+                        if ids is None:
+                            return self._responder(404, {"error": "Examen no encontrado"})
+                        objeto = _pagina([datos.preguntas[i - 1] for i in ids], consulta, config.paginar)
+                    else:
+                        return self._responder(404, {"error": "No encontrado"})
+                except ValueError as e:
+                    return self._responder(400, {"error": str(e)})
+                cuerpo = json.dumps(objeto).encode()
+                if len(cuerpos) > 2000:
+                    cuerpos.clear()  # Versiones antiguas y consultas poco repetidas
+                guardado = cuerpos[clave] = (cuerpo, '"' + hashlib.sha1(cuerpo).hexdigest() + '"')
+            cuerpo, etag = guardado
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._responder(200, cuerpo=cuerpo, etag=etag)
+
+        def do_POST(self):
+            cuerpo = self._leer_json()
+            if not self._simular_red():
+                return
+            ruta, _ = self._ruta()
+            clave = self.headers.get("Idempotency-Key")
+            with datos.lock:
+                if clave:
+                    if clave in datos.claves_idempotencia:
+                        return self._responder(409, {"error": "Envío duplicado"})
+                    datos.claves_idempotencia.add(clave)
+                datos.version += 1
+                partes = ruta.split("/")
+                if ruta == "examenes":
+                    examen = dict(cuerpo, id=max((e["id"] for e in datos.examenes), default=0) + 1)
+                    datos.examenes.append(examen)
+                    datos.preguntas_de[examen["id"]] = []
+                    return self._responder(201, examen)
+                if len(partes) == 3 and partes[0] == "examenes" and partes[2] == "preguntas":
+                    ids = [p["id"] for p in (cuerpo or {}).get("src", {}).get("preguntas", [])]
+                    datos.preguntas_de.setdefault(int(partes[1]), []).extend(ids)
+                    return self._responder(200, {"examenId": int(partes[1]), "preguntas": ids})
+                if ruta == "results":
+                    resultado = dict(cuerpo or {}, id=len(datos.resultados) + 1)
+                    datos.resultados.append(resultado)
+                    return self._responder(201, resultado)
+            self._responder(404, {"error": "No encontrado"})
+
+        def do_DELETE(self):
+            if not self._simular_red():
+                return
+            ruta, _ = self._ruta()
+            partes = ruta.split("/")
+            if len(partes) == 2 and partes[0] == "examenes" and partes[1].isdigit():
+                with datos.lock:
+                    datos.version += 1
+                    datos.examenes[:] = [e for e in datos.examenes if e["id"] != int(partes[1])]
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._responder(404, {"error": "No encontrado"})
+
+    return Handler
+
+
+class ServidorMock:
+    def __init__(self, config: ConfigMock = None, host="127.0.0.1", puerto=0):
+        self.config = config or ConfigMock()
+        self.datos = DatosMock(self.config)
+        self._servidor = ThreadingHTTPServer((host, puerto), crear_handler(self.datos, self.config))
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}/api"
+
+    def iniciar(self) -> str:
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="mock-api", daemon=True)
+        self._hilo.start()
+        return self.url
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+def argumentos_config(parser):
+    # Opciones del conjunto de datos y de la red simulada, compartidas con benchmark.py
+    parser.add_argument("--examenes", type=int, default=ConfigMock.examenes)
+    parser.add_argument("--preguntas", type=int, default=ConfigMock.preguntas)
+    parser.add_argument("--preguntas-por-examen", type=int, default=ConfigMock.preguntas_por_examen)
+    parser.add_argument("--usuarios", type=int, default=ConfigMock.usuarios)
+    parser.add_argument("--resultados", type=int, default=ConfigMock.resultados)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tasa-errores", type=float, default=0.0)
+    parser.add_argument("--sin-paginar", action="store_true", help="Ignorar page/size y devolver listas completas")
+    parser.add_argument("--semilla", type=int, default=ConfigMock.semilla)
+
+
+def config_desde_args(args) -> ConfigMock:
+    return ConfigMock(
+        examenes=args.examenes, preguntas=args.preguntas, preguntas_por_examen=args.preguntas_por_examen,
+        usuarios=args.usuarios, resultados=args.resultados, latencia_ms=args.latencia_ms,
+        jitter_ms=args.jitter_ms, tasa_errores=args.tasa_errores, paginar=not args.sin_paginar,
+        semilla=args.semilla,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API simulada de EvaluApp")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    argumentos_config(parser)
+    args = parser.parse_args(argv)
+    servidor = ServidorMock(config_desde_args(args), host=args.host, puerto=args.puerto)
+    print(f"API simulada en {servidor.url} (Ctrl+C para salir)")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor._servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
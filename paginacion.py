@@ -0,0 +1,76 @@
+import math
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Pagina:
+    items: list = field(default_factory=list)
+    numero: int = 0  # Empezando en 0, como el parámetro `page` de Spring
+    tamano: int = 20
+    total_elementos: int = 0
+
+    @property
+    def total_paginas(self) -> int:
+        return max(1, math.ceil(self.total_elementos / self.tamano)) if self.tamano else 1
+
+    @property
+    def hay_siguiente(self) -> bool:
+        return self.numero + 1 < self.total_paginas
+
+    @property
+    def hay_anterior(self) -> bool:
+        return self.numero > 0
+
+
+def paginar_local(items, numero, tamano) -> Pagina:
+    total = len(items)
+    ultima = max(0, math.ceil(total / tamano) - 1) if tamano else 0
+    numero = min(max(0, numero), ultima)
+    inicio = numero * tamano
+    return Pagina(items=items[inicio:inicio + tamano], numero=numero, tamano=tamano, total_elementos=total)
+
+
+def desde_respuesta(datos, numero, tamano) -> Pagina:
+    """Normaliza la respuesta de un listado paginado.
+
+    Acepta un `Page` de Spring (`content`, `totalElements`, `number`, `size`) o,
+    si el backend ignora los parámetros de paginación, la lista completa, que se
+    pagina localmente.
+    """
+    if isinstance(datos, dict) and "content" in datos:
+        return Pagina(
+            items=datos.get("content") or [],
+            numero=datos.get("number", numero),
+            tamano=datos.get("size", tamano) or tamano,
+            total_elementos=datos.get("totalElements", len(datos.get("content") or [])),
+        )
+    return paginar_local(datos or [], numero, tamano)
+
+
+def params_pagina(numero, tamano, sort=None, campos=None) -> dict:
+    # sort: "campo,asc" o "campo,desc" (formato de Spring); campos: proyección `fields`
+    params = {"page": numero, "size": tamano}
+    if sort:
+        params["sort"] = sort
+    if campos:
+        params["fields"] = ",".join(campos)
+    return params
+
+
+def ordenar_local(items, sort) -> list:
+    # Orden de `sort` para backends que devuelven la lista completa; los vacíos, al final
+    campo, _, direccion = sort.partition(",")
+    con_valor = [item for item in items if item.get(campo) is not None]
+    sin_valor = [item for item in items if item.get(campo) is None]
+    try:
+        con_valor.sort(key=lambda item: item[campo], reverse=direccion == "desc")
+    except TypeError:  # Tipos mezclados: se ordena como texto
+        con_valor.sort(key=lambda item: str(item[campo]), reverse=direccion == "desc")
+    return con_valor + sin_valor
+
+
+def proyectar(items, campos) -> list:
+    # Proyección local si el backend ignora `fields`
+    if not campos:
+        return items
+    return [{campo: item.get(campo) for campo in campos} for item in items]
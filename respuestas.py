@@ -0,0 +1,52 @@
+from dataclasses import dataclass, field
+
+
+# ---------------- Índice de opciones de un examen -------------------
+@dataclass
+class IndiceOpciones:
+    # (id de pregunta, texto de la opción) -> id de la opción
+    opciones: dict = field(default_factory=dict)
+    preguntas: set = field(default_factory=set)
+
+    @classmethod
+    def desde_preguntas(cls, preguntas) -> "IndiceOpciones":
+        indice = cls()
+        indice.agregar(preguntas)
+        return indice
+
+    def agregar(self, preguntas):
+        # Amplía el índice con otra página de preguntas del mismo examen
+        for pregunta in preguntas:
+            self.preguntas.add(pregunta['id'])
+            for opcion in pregunta.get('opciones') or []:
+                self.opciones[(pregunta['id'], opcion['texto'])] = opcion['id']
+
+    def opcion_id(self, pregunta_id, texto):
+        try:
+            return self.opciones[(pregunta_id, texto)]
+        except KeyError:
+            raise ValueError(f"La opción '{texto}' no existe en la pregunta {pregunta_id}") from None
+
+
+def construir_payload(examen_id, respuestas, indice: IndiceOpciones) -> dict:
+    # Una búsqueda en el índice por opción elegida: O(respuestas). `respuestas` son
+    # sólo las del examen y el índice debe tener todas sus preguntas: una respuesta
+    # que no se puede resolver es un error, nunca se descarta sin avisar
+    payload = {
+        "examenId": int(examen_id),
+        "opcionesSeleccionadas": []
+    }
+    for pregunta_id, respuesta in respuestas.items():
+        if pregunta_id not in indice.preguntas:
+            raise ValueError(f"La pregunta {pregunta_id} ya no forma parte del examen {examen_id}")
+        if respuesta['tipo'] == 'SELECCION_UNICA':
+            # Para selección única, enviar el ID de la opción
+            payload["opcionesSeleccionadas"].append(indice.opcion_id(pregunta_id, respuesta['respuesta']))
+        elif respuesta['tipo'] == 'MULTIPLE':
+            # Para múltiple, enviar los IDs de las opciones
+            for respuesta_text in respuesta['respuesta']:
+                payload["opcionesSeleccionadas"].append(indice.opcion_id(pregunta_id, respuesta_text))
+        elif respuesta['tipo'] == 'TEXTO_ABIERTO':
+            # Para texto abierto, guardar la respuesta como texto
+            payload[f"texto_abierto_{pregunta_id}"] = respuesta['respuesta']
+    return payload
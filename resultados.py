@@ -0,0 +1,180 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Nombres con los que el backend puede enviar cada campo de un resultado
+ALIAS = {
+    "examen": ("examenId", "examen_id", "examen"),
+    "usuario": ("usuarioId", "estudianteId", "userId", "usuario_id", "usuario", "estudiante"),
+    "puntaje": ("puntaje", "puntuacion", "calificacion", "nota", "score"),
+    "fecha": ("fecha", "fechaRealizacion", "fechaEnvio", "fechaFin", "createdAt"),
+    "completado": ("completado", "finalizado", "completed"),
+    "respuestas": ("respuestas", "detalle", "items"),
+}
+ALIAS_PREGUNTA = ("preguntaId", "pregunta_id", "pregunta")
+ALIAS_CORRECTA = ("correcta", "esCorrecta", "correct")
+
+
+@dataclass
+class TablaResultados:
+    # Una fila por resultado: examen y usuario categóricos, puntaje float32, fecha y completado
+    resultados: pd.DataFrame
+    # Una fila por pregunta respondida: fila del resultado, pregunta (categórica) y si fue correcta
+    items: pd.DataFrame
+
+
+def _clave(muestra, alias):
+    return next((a for a in alias if a in muestra), None)
+
+
+def _id(valor):
+    # Campos que llegan como objeto anidado ({"id": ..., ...})
+    return valor.get("id") if isinstance(valor, dict) else valor
+
+
+def construir_tabla(registros) -> TablaResultados:
+    """Convierte la lista de resultados del backend en columnas compactas.
+
+    Los nombres de los campos se detectan con el primer registro. Si no viene
+    un puntaje se usa la fracción de respuestas correctas, y si no viene el
+    estado se considera completado todo resultado enviado.
+    """
+    registros = [r for r in registros if isinstance(r, dict)]
+    muestra = registros[0] if registros else {}
+    claves = {campo: _clave(muestra, alias) for campo, alias in ALIAS.items()}
+
+    def columna(campo, convertir=None):
+        clave = claves[campo]
+        if clave is None:
+            return None
+        if convertir is None:
+            return [r.get(clave) for r in registros]
+        return [convertir(r.get(clave)) for r in registros]
+
+    # Respuestas por pregunta en formato largo, sin crear un DataFrame por resultado
+    filas, preguntas, correctas = [], [], []
+    if claves["respuestas"] is not None:
+        for fila, registro in enumerate(registros):
+            respuestas = registro.get(claves["respuestas"]) or []
+            if not respuestas:
+                continue
+            clave_pregunta = _clave(respuestas[0], ALIAS_PREGUNTA)
+            clave_correcta = _clave(respuestas[0], ALIAS_CORRECTA)
+            if clave_pregunta is None or clave_correcta is None:
+                continue
+            for respuesta in respuestas:
+                filas.append(fila)
+                preguntas.append(_id(respuesta.get(clave_pregunta)))
+                correctas.append(bool(respuesta.get(clave_correcta)))
+    items = pd.DataFrame({
+        "fila": np.asarray(filas, dtype=np.int32),
+        "pregunta": pd.Categorical(preguntas),
+        "correcta": np.asarray(correctas, dtype=bool),
+    })
+
+    n = len(registros)
+    puntajes = columna("puntaje")
+    if puntajes is not None:
+        puntaje = pd.to_numeric(pd.Series(puntajes, dtype=object), errors="coerce").to_numpy(dtype=np.float32)
+    else:
+        # Fracción de respuestas correctas de cada resultado
+        total = np.bincount(items["fila"], minlength=n)
+        aciertos = np.bincount(items["fila"], weights=items["correcta"], minlength=n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            puntaje = (aciertos / total).astype(np.float32)
+
+    fechas = columna("fecha")
+    completados = columna("completado")
+    resultados = pd.DataFrame({
+        "examen": pd.Categorical(columna("examen", _id) or [None] * n),
+        "usuario": pd.Categorical(columna("usuario", _id) or [None] * n),
+        "puntaje": puntaje,
+        "fecha": (pd.to_datetime(pd.Series(fechas, dtype=object), errors="coerce", utc=True).dt.tz_localize(None)
+                  if fechas is not None else pd.Series(pd.NaT, index=range(n), dtype="datetime64[ns]")),
+        "completado": (np.asarray([bool(c) for c in completados], dtype=bool)
+                       if completados is not None else np.ones(n, dtype=bool)),
+    })
+    return TablaResultados(resultados=resultados, items=items)
+
+
+def filtrar(tabla: TablaResultados, examenes=None, usuarios=None, desde=None, hasta=None) -> np.ndarray:
+    # Máscara booleana sobre tabla.resultados; los filtros vacíos no restringen
+    df = tabla.resultados
+    mascara = np.ones(len(df), dtype=bool)
+    if examenes:
+        mascara &= df["examen"].isin(examenes).to_numpy()
+    if usuarios:
+        mascara &= df["usuario"].isin(usuarios).to_numpy()
+    # Los resultados sin fecha no se descartan por el rango de fechas
+    fecha = df["fecha"]
+    if desde is not None:
+        mascara &= ((fecha >= pd.Timestamp(desde)) | fecha.isna()).to_numpy()
+    if hasta is not None:
+        mascara &= ((fecha < pd.Timestamp(hasta) + pd.Timedelta(days=1)) | fecha.isna()).to_numpy()
+    return mascara
+
+
+def distribucion_puntajes(puntajes, intervalos=10) -> pd.DataFrame:
+    puntajes = np.asarray(puntajes, dtype=np.float64)
+    puntajes = puntajes[~np.isnan(puntajes)]
+    if not len(puntajes):
+        return pd.DataFrame({"resultados": []})
+    conteo, bordes = np.histogram(puntajes, bins=intervalos)
+    rangos = [f"{a:g}–{b:g}" for a, b in zip(bordes[:-1].round(2), bordes[1:].round(2))]
+    return pd.DataFrame({"resultados": conteo}, index=pd.Index(rangos, name="puntaje"))
+
+
+def resumen_por_examen(tabla: TablaResultados, mascara, total_usuarios=None) -> pd.DataFrame:
+    """Puntajes por examen y tasa de finalización.
+
+    La tasa es la fracción de usuarios con un resultado completado del examen
+    sobre `total_usuarios` (por defecto, los usuarios distintos de la tabla).
+    """
+    df = tabla.resultados[mascara]
+    resumen = df.groupby("examen", observed=True)["puntaje"].agg(["count", "mean", "median", "std"])
+    resumen.columns = ["resultados", "media", "mediana", "desviacion"]
+    if total_usuarios is None:
+        total_usuarios = tabla.resultados["usuario"].nunique()
+    completados = df[df["completado"]].groupby("examen", observed=True)["usuario"].nunique()
+    resumen["finalizacion"] = (completados.reindex(resumen.index, fill_value=0) / max(total_usuarios, 1))
+    return resumen
+
+
+def analisis_items(tabla: TablaResultados, mascara) -> pd.DataFrame:
+    """Dificultad y discriminación de cada pregunta.
+
+    Dificultad: proporción de aciertos. Discriminación: correlación
+    punto-biserial entre acertar la pregunta y el puntaje total del resultado.
+    Se calculan con sumas por pregunta (np.bincount), sin agrupar objetos.
+    """
+    items = tabla.items
+    if items.empty:
+        return pd.DataFrame(columns=["respuestas", "dificultad", "discriminacion"])
+    filas = items["fila"].to_numpy()
+    seleccion = mascara[filas]
+    filas = filas[seleccion]
+    codigos = items["pregunta"].cat.codes.to_numpy()[seleccion]
+    c = items["correcta"].to_numpy()[seleccion].astype(np.float64)
+    x = tabla.resultados["puntaje"].to_numpy(dtype=np.float64)[filas]
+    validos = ~np.isnan(x) & (codigos >= 0)
+    codigos, c, x = codigos[validos], c[validos], x[validos]
+
+    k = len(items["pregunta"].cat.categories)
+    n = np.bincount(codigos, minlength=k)
+    sc = np.bincount(codigos, weights=c, minlength=k)
+    sx = np.bincount(codigos, weights=x, minlength=k)
+    sx2 = np.bincount(codigos, weights=x * x, minlength=k)
+    scx = np.bincount(codigos, weights=c * x, minlength=k)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = sc / n
+        media_aciertos = scx / sc
+        media_fallos = (sx - scx) / (n - sc)
+        desviacion = np.sqrt(np.maximum(sx2 / n - (sx / n) ** 2, 0))
+        discriminacion = (media_aciertos - media_fallos) / desviacion * np.sqrt(p * (1 - p))
+
+    analisis = pd.DataFrame(
+        {"respuestas": n, "dificultad": p, "discriminacion": discriminacion},
+        index=pd.Index(items["pregunta"].cat.categories, name="pregunta"),
+    )
+    return analisis[analisis["respuestas"] > 0]